@@ -66,8 +66,11 @@ class BaseAgent(ABC):
     
     def create_response(self, task_id: str, success: bool, data: Dict[str, Any] = None, 
                        message: str = "", error: str = None) -> AgentResponse:
-        """Helper method to create standardized responses"""
-        return AgentResponse(
+        """
+        Helper method to create standardized responses.
+        Fields come from the agent itself, so validation is skipped.
+        """
+        return AgentResponse.model_construct(
             agent_id=self.agent_id,
             task_id=task_id,
             success=success,
@@ -9,15 +9,18 @@ offers to draft emails when direct answers are not available.
 
 import re
 import asyncio
-import json
+import hashlib
 import logging
 import os
-import uuid
+import time
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List, Optional, TypedDict
 from datetime import datetime
 
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
-from langchain_core.prompts import PromptTemplate
+import numpy as np
+import orjson
+
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
 from langchain_core.documents import Document
 from langgraph.graph import StateGraph, END
@@ -26,11 +29,44 @@ from typing_extensions import TypedDict
 from .base_agent import BaseAgent, AgentState, AgentResponse
 from ..services.azure_search_service import AdaptiveHybridAzureSearchRetriever
 from ..services.memory_service import ConversationMemoryService
+from ..services.response_cache import ResponseCache
+from ..services.llm_service import get_chat_llm, get_embeddings
 
 from ..services.query_processor import QueryProcessor
 from langchain_core.output_parsers import JsonOutputParser
 from ..config import settings
 
+_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+')
+_CONTACT_NAME_RE = re.compile(r'[A-Z][a-z]+ [A-Z][a-z]+')
+
+# Workflow events are stamped to the second; the formatted string is reused within each second
+_iso_cache = [0, ""]
+
+
+def _iso_now() -> str:
+    """Returns the current local time as an ISO-8601 string, formatted at most once per second."""
+    second = int(time.time())
+    if second != _iso_cache[0]:
+        _iso_cache[1] = datetime.fromtimestamp(second).isoformat()
+        _iso_cache[0] = second
+    return _iso_cache[1]
+
+
+# Question keywords (matched anywhere, case-insensitively) mapped to the topic named in fallback answers
+_FALLBACK_TOPICS = (
+    (re.compile(r'import|customs', re.IGNORECASE), "international procurement and customs requirements"),
+    (re.compile(r'equipment|accelerator|medical', re.IGNORECASE), "specialized equipment procurement"),
+    (re.compile(r'switzerland|canada|germany', re.IGNORECASE), "international vendor requirements"),
+)
+
+# Relevance can be judged from the start of a chunk, so graders only see this many characters
+_GRADING_MAX_CHARS = 2000
+
+
+def _head(text: str, limit: int = _GRADING_MAX_CHARS) -> str:
+    """Returns the first `limit` characters of `text`, marking it when truncated."""
+    return text if len(text) <= limit else text[:limit] + " …[truncated]"
+
 
 class RAGGraphState(TypedDict):
     """Represents the state of our RAG graph.
@@ -41,12 +77,38 @@ class RAGGraphState(TypedDict):
         generation: The final answer generated by the LLM.
         documents: The list of documents retrieved and processed through the pipeline.
         conversation_memory: The history of the conversation.
+        question_vector: Embedding of the original question, when already computed for the cache lookup.
     """
     question: str
     original_question: str
     generation: str
     documents: List[Document]
     conversation_memory: dict
+    question_vector: Optional[List[float]]
+
+
+class PipelineReservation:
+    """
+    A place in the RAG pipeline queue, taken when a request is admitted.
+
+    The place is handed to `_pipeline_slot` when the graph run starts, or given back with
+    `release()` if the request is answered another way; `release()` is safe to call twice.
+    """
+
+    def __init__(self, agent: "RAGAgent"):
+        self._agent = agent
+        self.held = True
+
+    def claim(self) -> bool:
+        """Hands the place to the pipeline slot; False if it was already claimed or released."""
+        claimed, self.held = self.held, False
+        return claimed
+
+    def release(self):
+        """Gives the place back if it was never used for a graph run."""
+        if self.held:
+            self.held = False
+            self._agent._pipeline_waiting -= 1
 
 
 class RAGAgent(BaseAgent):
@@ -66,48 +128,62 @@ class RAGAgent(BaseAgent):
         self.embeddings = None
         self.retriever = None
         self.memory_service = ConversationMemoryService("backend/conversation_memory.json")
+        self.response_cache = ResponseCache(
+            maxsize=settings.rag_cache_max_entries,
+            ttl=settings.rag_cache_ttl_seconds,
+            similarity_threshold=settings.rag_cache_similarity_threshold,
+        )
         self.query_processor = None  # Will be initialized after LLM is set up
+        # Futures for first-turn questions currently running, keyed like the response cache
+        self._inflight_answers: Dict[bytes, asyncio.Future] = {}
+        # Caps concurrent graph runs so bursts queue here instead of overloading Azure OpenAI
+        self._pipeline_slots = asyncio.Semaphore(settings.rag_max_concurrency)
+        self._pipeline_active = 0
+        self._pipeline_waiting = 0
+        # LCEL chains are stateless, so they are composed once the LLM is available and reused
+        self._answer_chain = None
+        self._grading_chain = None
+        self._sufficiency_chain = None
         self.graph = self._build_graph()
         
         # Setup structured logging for observability
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
         self.logger.setLevel(logging.INFO)
 
-        # Load prompt from external file
-        self._enhanced_prompt_template = self._load_prompt_template()
+        # Load the static answer instructions from an external file
+        self._answer_system_prompt = self._load_prompt_template()
 
     def _load_prompt_template(self) -> str:
-        """Loads the prompt template from an external file."""
+        """Loads the static answer-generation instructions from an external file."""
         prompt_path = os.path.join(os.path.dirname(__file__), "prompt_template.md")
         try:
             with open(prompt_path, "r") as f:
                 return f.read()
         except FileNotFoundError:
-            logging.error(f"Prompt template file not found at {prompt_path}")
+            self.logger.error("Prompt template file not found at %s", prompt_path)
             # Fallback to a default prompt if the file is missing
-            return "You are a helpful assistant. Answer the user's question based on the context provided.\n\nContext: {context}\n\nQuestion: {question}"
+            return "You are a helpful assistant. Answer the user's question based on the context provided."
 
     def _build_graph(self) -> StateGraph:
-        """Builds and compiles the LangGraph workflow for the RAG pipeline."""
-        self._initialize_models()
-        
+        """Builds and compiles the LangGraph workflow for the RAG pipeline.
+
+        Models are not created here; they are initialized lazily on the first request.
+        """
         workflow = StateGraph(RAGGraphState)
 
         # Define the nodes in the graph
         workflow.add_node("rewrite_query", self._rewrite_query_with_history)
         workflow.add_node("retrieve_documents", self._retrieve_documents)
-        workflow.add_node("grade_documents", self._grade_documents_for_relevance)
-        workflow.add_node("rerank_documents", self._rerank_documents_for_context)
+        workflow.add_node("grade_and_rerank_documents", self._grade_and_rerank_documents)
         workflow.add_node("generate_answer", self._generate_answer)
         workflow.add_node("handle_no_documents", self._handle_no_documents_found)
 
         # Define the flow of the graph
         workflow.set_entry_point("rewrite_query")
         workflow.add_edge("rewrite_query", "retrieve_documents")
-        workflow.add_edge("retrieve_documents", "grade_documents")
-        workflow.add_edge("grade_documents", "rerank_documents")
+        workflow.add_edge("retrieve_documents", "grade_and_rerank_documents")
         workflow.add_conditional_edges(
-            "rerank_documents",
+            "grade_and_rerank_documents",
             self._decide_to_generate_or_fallback,
             {
                 "generate": "generate_answer",
@@ -126,91 +202,128 @@ class RAGAgent(BaseAgent):
         
         try:
             self._initialize_models()
-            initial_state = RAGGraphState(
-                question=question,
-                conversation_id=conversation_id,
-
-                conversation_memory=self.memory_service.load_conversation_memory(conversation_id),
-                documents=[],
-                generation="",
-                original_question=question
-            )
-
-            final_state = await self.graph.ainvoke(initial_state)
-            self._update_conversation_memory(conversation_id, question, final_state)
-
-            return AgentResponse(
-                agent_id=self.agent_id,
+            conversation_memory = await asyncio.to_thread(self.memory_service.load_conversation_memory, conversation_id)
+            final_state, question_vector = await self._get_cached_answer(question, conversation_memory)
+            inflight = None
+            if final_state is None:
+                final_state, inflight = await self._join_or_lead_inflight(question, conversation_memory)
+            if final_state is None:
+                initial_state = RAGGraphState(
+                    question=question,
+                    conversation_id=conversation_id,
+
+                    conversation_memory=conversation_memory,
+                    documents=[],
+                    generation="",
+                    original_question=question,
+                    question_vector=question_vector
+                )
 
+                try:
+                    async with self._pipeline_slot():
+                        final_state = await self.graph.ainvoke(initial_state)
+                    self._cache_answer(question, conversation_memory, final_state, question_vector)
+                finally:
+                    self._finish_inflight(question, inflight, final_state)
+            await self._update_conversation_memory(conversation_id, question, final_state)
+
+            return self.create_response(
+                state.task_id,
                 success=True,
                 message=final_state.get("generation", ""),
                 data={"sources": self._create_source_list(final_state.get("documents", []))}
             )
         except Exception as e:
-            print(f"Error during RAG graph processing: {e}")
-            return AgentResponse(
-                agent_id=self.agent_id,
-
+            self.logger.exception("Error during RAG graph processing")
+            return self.create_response(
+                state.task_id,
                 success=False,
-                message=f"An error occurred: {e}"
+                message=f"An error occurred: {e}",
+                error=str(e)
             )
 
-    async def stream_run(self, question: str, conversation_id: Optional[str] = None):
-        task_id = str(uuid.uuid4())
-        """Executes the RAG graph as an async generator, yielding the final response."""
+    async def stream_run(self, question: str, conversation_id: Optional[str] = None,
+                         reservation: Optional[PipelineReservation] = None):
+        """
+        Executes the RAG graph as an async generator, yielding answer tokens as they are generated.
+        A `reservation` from `reserve_pipeline_slot` is used for the graph run, or released if
+        the answer comes from the cache or another in-flight run.
+        """
         # Structured logging for observability
-        workflow_start = datetime.now()
+        workflow_start = time.perf_counter()
         self._log_workflow_event("workflow_started", {
             "conversation_id": conversation_id,
             "question": question,
-            "timestamp": workflow_start.isoformat()
+            "timestamp": _iso_now()
         })
         
         try:
             self._initialize_models()
             
-            # Load conversation memory and log context
-            conversation_memory = self.memory_service.load_conversation_memory(conversation_id)
+            # Load conversation memory off the event loop and log context
+            conversation_memory = await asyncio.to_thread(self.memory_service.load_conversation_memory, conversation_id)
             self._log_workflow_event("memory_loaded", {
     
                 "conversation_id": conversation_id,
                 "memory_entries": len(conversation_memory.get("history", [])),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _iso_now()
             })
             
-            initial_state = {
-                "question": question,
-                "original_question": question,
-                "generation": "",
-                "documents": [],
-                "conversation_memory": conversation_memory,
-            }
-
-            final_state = None
-            # Use astream to get the final state after all nodes have run
-            async for event in self.graph.astream(initial_state):
-                # Log each graph event for observability
-                for node_name, node_output in event.items():
-                    self._log_workflow_event("node_executed", {
-            
-                        "node_name": node_name,
-                        "timestamp": datetime.now().isoformat()
-                    })
+            streamed_answer = False
+            final_state, question_vector = await self._get_cached_answer(question, conversation_memory)
+            inflight = None
+            if final_state is None:
+                final_state, inflight = await self._join_or_lead_inflight(question, conversation_memory, reservation)
+            if final_state is not None:
+                if reservation is not None:
+                    reservation.release()
+                self._log_workflow_event("cache_hit", {
+                    "conversation_id": conversation_id,
+                    "timestamp": _iso_now()
+                })
+            else:
+                try:
+                    initial_state = {
+                        "question": question,
+                        "original_question": question,
+                        "generation": "",
+                        "documents": [],
+                        "conversation_memory": conversation_memory,
+                        "question_vector": question_vector,
+                    }
+                    final_state = dict(initial_state)
+
+                    # Stream answer tokens as the LLM produces them and keep the graph's final state
+                    async with self._pipeline_slot(reservation):
+                        async for event in self.graph.astream_events(initial_state, version="v1"):
+                            kind = event["event"]
+                            if kind == "on_chat_model_stream" and self._ANSWER_STREAM_TAG in event.get("tags", []):
+                                token = event["data"]["chunk"].content
+                                if token:
+                                    streamed_answer = True
+                                    yield token
+                            elif kind == "on_chain_end" and event["name"] in self.graph.nodes:
+                                # Fold each node's state update into the final state and log it for observability
+                                node_output = event["data"].get("output")
+                                if isinstance(node_output, dict):
+                                    final_state.update(node_output)
+                                self._log_workflow_event("node_executed", {
                 
-                # Check for the final state in different possible formats
-                if "__end__" in event:
-                    final_state = event["__end__"]
-                    self._log_workflow_event("workflow_completed", {
+                                    "node_name": event["name"],
+                                    "timestamp": _iso_now()
+                                })
+
+                    if final_state:
+                        self._log_workflow_event("workflow_completed", {
             
-                        "has_generation": bool(final_state.get("generation")),
-                        "document_count": len(final_state.get("documents", [])),
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    break
-                # Also check for direct node outputs that might contain our generation
-                for node_name, node_output in event.items():
-                    if isinstance(node_output, dict) and "generation" in node_output:
-                        final_state = node_output
+                            "has_generation": bool(final_state.get("generation")),
+                            "document_count": len(final_state.get("documents", [])),
+                            "timestamp": _iso_now()
+                        })
+                        self._cache_answer(question, conversation_memory, final_state, question_vector)
+                finally:
+                    # Hand the result to identical requests that arrived while this one was running
+                    self._finish_inflight(question, inflight, final_state)
             
             if final_state and final_state.get("generation"):
                 generation = final_state.get("generation", "")
@@ -220,40 +333,41 @@ class RAGAgent(BaseAgent):
         
                     "response_length": len(generation),
                     "document_count": len(final_state.get("documents", [])),
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": _iso_now()
                 })
                 
                 try:
                     # Update memory with the final result
-                    self._update_conversation_memory(conversation_id, question, final_state)
+                    await self._update_conversation_memory(conversation_id, question, final_state)
                     self._log_workflow_event("memory_updated", {
             
                         "conversation_id": conversation_id,
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": _iso_now()
                     })
                 except Exception as memory_error:
                     self._log_workflow_event("memory_error", {
             
                         "error": str(memory_error),
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": _iso_now()
                     })
                 
                 # Calculate total processing time
-                processing_time = (datetime.now() - workflow_start).total_seconds()
+                processing_time = time.perf_counter() - workflow_start
                 self._log_workflow_event("workflow_finished", {
         
                     "processing_time_seconds": processing_time,
                     "success": True,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": _iso_now()
                 })
                 
-                # Yield the final answer as a single chunk for the stream
-                yield generation
+                # Answers that were not streamed token by token (cache hits, fallbacks) go out as a single chunk
+                if not streamed_answer:
+                    yield generation
             else:
                 self._log_workflow_event("workflow_failed", {
         
                     "reason": "no_generation_found",
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": _iso_now()
                 })
                 yield "I could not find an answer to your question."
 
@@ -262,9 +376,25 @@ class RAGAgent(BaseAgent):
     
                 "error": str(e),
                 "error_type": type(e).__name__,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": _iso_now()
             })
             yield f"An error occurred: {e}"
+        finally:
+            if reservation is not None:
+                reservation.release()
+
+    async def warmup(self):
+        """Initializes models and primes the Azure connections so the first request runs at steady-state latency."""
+        try:
+            self._initialize_models()
+            await asyncio.gather(
+                self.llm.bind(max_tokens=1).ainvoke("ping"),
+                self.embeddings.aembed_query("ping"),
+                self.retriever._acheck_semantic_availability(),
+            )
+            self.logger.info("RAG agent warmup complete")
+        except Exception as e:
+            self.logger.warning("RAG agent warmup failed, models will initialize on first request: %s", e)
 
     # --- Graph Node Implementations ---
 
@@ -274,43 +404,41 @@ class RAGAgent(BaseAgent):
         question = state["question"]
         conversation_memory = state["conversation_memory"]
         
-        # Debug logging to understand conversation memory
-        self.logger.info(f"DEBUG: Question = {question}")
-        self.logger.info(f"DEBUG: Conversation memory type = {type(conversation_memory)}")
-        self.logger.info(f"DEBUG: Conversation memory keys = {list(conversation_memory.keys()) if isinstance(conversation_memory, dict) else 'Not a dict'}")
-        if isinstance(conversation_memory, dict) and "history" in conversation_memory:
-            self.logger.info(f"DEBUG: History length = {len(conversation_memory['history'])}")
-            if conversation_memory['history']:
-                self.logger.info(f"DEBUG: First history entry = {conversation_memory['history'][0]}")
+        # Debug logging to understand conversation memory; skipped entirely unless DEBUG is enabled
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
+        if debug_enabled:
+            self.logger.debug("Question = %s", question)
+            self.logger.debug("Conversation memory type = %s", type(conversation_memory))
+            self.logger.debug("Conversation memory keys = %s", list(conversation_memory.keys()) if isinstance(conversation_memory, dict) else 'Not a dict')
+            if isinstance(conversation_memory, dict) and "history" in conversation_memory:
+                self.logger.debug("History length = %s", len(conversation_memory['history']))
+                if conversation_memory['history']:
+                    self.logger.debug("First history entry = %s", conversation_memory['history'][0])
         
         rewritten_question = await self.query_processor.rewrite_query(question, conversation_memory)
-        self.logger.info(f"DEBUG: Original question = {question}")
-        self.logger.info(f"DEBUG: Rewritten question = {rewritten_question}")
+        if debug_enabled:
+            self.logger.debug("Original question = %s", question)
+            self.logger.debug("Rewritten question = %s", rewritten_question)
         return {"question": rewritten_question, "original_question": question}
 
-    def _retrieve_documents(self, state: RAGGraphState) -> Dict[str, Any]:
+    async def _retrieve_documents(self, state: RAGGraphState) -> Dict[str, Any]:
         """Retrieves documents from Azure Search based on the rewritten query."""
         self.logger.info("---NODE: Retrieving documents---")
-        documents = self.retriever.invoke(state["question"])
-        return {"documents": documents}
-
-    def _grade_documents_for_relevance(self, state: RAGGraphState) -> Dict[str, Any]:
-        """Grades retrieved documents for relevance to the original question."""
-        self.logger.info("---NODE: Grading documents---")
-        if not state.get("documents"):
-            return {"documents": []}
-        
-        graded_docs = self._grade_documents_for_relevance_sync(state["documents"], state["original_question"])
-        return {"documents": graded_docs}
-
-    def _rerank_documents_for_context(self, state: RAGGraphState) -> Dict[str, Any]:
-        """Re-ranks relevant documents to provide the best context for the answer."""
-        self.logger.info("---NODE: Re-ranking documents---")
+        # The cache lookup's embedding is only valid for retrieval if the query was not rewritten
+        question_vector = state.get("question_vector") if state["question"] == state["original_question"] else None
+        documents = await self.retriever.ainvoke(state["question"], query_embedding=question_vector)
+        return {"documents": self._deduplicate_documents(documents)}
+
+    async def _grade_and_rerank_documents(self, state: RAGGraphState) -> Dict[str, Any]:
+        """Grades retrieved documents for relevance and re-ranks the relevant ones in a single step."""
+        self.logger.info("---NODE: Grading and re-ranking documents---")
         if not state.get("documents"):
             return {"documents": []}
         
-        reranked_docs = self._rerank_documents_for_context_sync(state["documents"], state["original_question"])
-        return {"documents": reranked_docs}
+        ranked_docs = await self._grade_and_rank_documents(
+            state["documents"], state["original_question"], state.get("question_vector")
+        )
+        return {"documents": ranked_docs}
 
     def _decide_to_generate_or_fallback(self, state: RAGGraphState) -> str:
         """Decides whether to generate an answer or use a fallback response."""
@@ -321,7 +449,7 @@ class RAGAgent(BaseAgent):
         self.logger.info("---DECISION: No relevant documents, using fallback.---")
         return "fallback"
 
-    def _generate_answer(self, state: RAGGraphState) -> Dict[str, Any]:
+    async def _generate_answer(self, state: RAGGraphState) -> Dict[str, Any]:
         """Generates the final answer using the re-ranked documents and conversation history."""
         self.logger.info("---NODE: Generating answer---")
         documents = state.get("documents", [])
@@ -333,7 +461,7 @@ class RAGAgent(BaseAgent):
         contact_info_str = self._prepare_contact_info_for_prompt(contacts)
         
         # Determine if the documents are sufficient for a direct answer
-        is_sufficient = self._are_documents_sufficient_for_answer_sync(documents, original_question)
+        is_sufficient = await self._are_documents_sufficient_for_answer(documents, original_question)
 
         # If documents are insufficient but a contact was found, offer to draft an email.
         if not is_sufficient and contact_info_str:
@@ -349,14 +477,7 @@ class RAGAgent(BaseAgent):
         context = self._format_documents_for_context(documents)
         history = self.query_processor.format_conversation_history(conversation_memory.get("history", []))
         
-        # Enhanced prompt template with better formatting
-        enhanced_prompt = PromptTemplate(
-            template=self._enhanced_prompt_template,
-            input_variables=["context", "question", "history", "contact_info"],
-        )
-        rag_chain = enhanced_prompt | self.llm | StrOutputParser()
-        
-        generation = rag_chain.invoke({
+        generation = await self._answer_chain.ainvoke({
             "context": context,
             "question": original_question,
             "history": history,
@@ -379,7 +500,7 @@ class RAGAgent(BaseAgent):
         # Create a more specific, visually appealing response
         if contacts:
             contact_info_str = self._prepare_contact_info_for_prompt(contacts)
-            self.logger.info(f"---LOGIC: No relevant docs, but contact found: {contact_info_str}. Offering email draft.---")
+            self.logger.info("---LOGIC: No relevant docs, but contact found: %s. Offering email draft.---", contact_info_str)
             generation = self._create_specific_contact_response(original_question, contact_info_str)
         else:
             # No contacts found, provide helpful fallback with Richard Pallangyo as default contact
@@ -409,17 +530,8 @@ From our procurement policies, I know that specialized purchases often require a
     
     def _create_specific_fallback_response(self, question: str) -> str:
         """Creates a specific, professional fallback response."""
-        # Extract key terms from the question to make response more specific
-        question_lower = question.lower()
-        specific_terms = []
-        
-        # Identify specific procurement-related terms
-        if "import" in question_lower or "customs" in question_lower:
-            specific_terms.append("international procurement and customs requirements")
-        if "equipment" in question_lower or "accelerator" in question_lower or "medical" in question_lower:
-            specific_terms.append("specialized equipment procurement")
-        if "switzerland" in question_lower or "canada" in question_lower or "germany" in question_lower:
-            specific_terms.append("international vendor requirements")
+        # Identify specific procurement-related terms to make the response more specific
+        specific_terms = [topic for pattern, topic in _FALLBACK_TOPICS if pattern.search(question)]
         
         specific_context = ", ".join(specific_terms) if specific_terms else "specialized procurement questions"
         
@@ -444,20 +556,9 @@ From our procurement policies, I know that specialized purchases often require a
         """Initializes Azure OpenAI models and other essential services."""
         try:
             if self.llm is None:
-                self.llm = AzureChatOpenAI(
-                    azure_endpoint=settings.azure_openai_chat_endpoint,
-                    api_key=settings.azure_openai_chat_key,
-                    deployment_name=settings.azure_openai_chat_deployment,
-                    api_version=settings.azure_openai_api_version,
-                    temperature=0.1,
-                )
+                self.llm = get_chat_llm()
             if self.embeddings is None:
-                self.embeddings = AzureOpenAIEmbeddings(
-                    azure_endpoint=settings.azure_openai_embedding_endpoint,
-                    api_key=settings.azure_openai_embedding_key,
-                    azure_deployment=settings.azure_openai_embedding_deployment,
-                    api_version=settings.azure_openai_api_version,
-                )
+                self.embeddings = get_embeddings()
             if self.retriever is None:
                 self.retriever = AdaptiveHybridAzureSearchRetriever(
                     search_service=settings.azure_search_service,
@@ -468,67 +569,188 @@ From our procurement policies, I know that specialized purchases often require a
 
             if self.query_processor is None:
                 self.query_processor = QueryProcessor(self.llm)
+            if self._answer_chain is None:
+                self._build_chains()
         except Exception as e:
-            # Consider more specific logging or error handling here
-            print(f"Fatal error during model initialization: {e}")
+            self.logger.exception("Fatal error during model initialization")
             raise
 
-    _grade_relevance_prompt_template = """You are a grader assessing the relevance of a retrieved document to a user question.\n\n    RULES:\n    - If the document contains keywords or semantic meaning relevant to the question, grade it as 'relevant'.\n    - If the document is not relevant, grade it as 'not relevant'.\n    - Your response must be a single JSON object with a single key 'score' and a value of either 'relevant' or 'not relevant'.\n\n    DOCUMENT:\n    {document}\n\n    QUESTION:\n    {question}\n\n    JSON RESPONSE:\n    """
-
-    _grade_sufficiency_prompt_template = """You are a grader assessing if a set of documents contains enough information to fully answer a user's question.\n\n    RULES:\n    - Evaluate if the combined information in the documents is sufficient to provide a complete and direct answer.\n    - If yes, respond with a JSON object: {{"sufficient": true}}\n    - If no, respond with a JSON object: {{"sufficient": false}}\n\n    DOCUMENTS:\n    {documents}\n\n    QUESTION:\n    {question}\n\n    JSON RESPONSE:\n    """
-
-    def _grade_documents_for_relevance_sync(self, documents: List[Document], question: str) -> List[Document]:
-        """Grades documents for relevance and filters out irrelevant ones."""
+    def _build_chains(self):
+        """Composes the answer, grading and sufficiency chains for the current LLM."""
+        # Static instructions go in the system message so the prompt prefix is cacheable
+        answer_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._answer_system_prompt),
+            ("human", self._answer_human_prompt),
+        ])
+        self._answer_chain = (answer_prompt | self.llm | StrOutputParser()).with_config(tags=[self._ANSWER_STREAM_TAG])
+
+        # Graders only emit a small JSON object, so run them deterministically with a tight output cap.
+        # JSON mode is not requested: older deployments (gpt-4 0613) reject it, and the parser handles plain text
+        grader_kwargs = {"temperature": 0}
+
+        grading_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._grade_relevance_system_prompt),
+            ("human", self._grade_human_prompt),
+        ])
+        grading_llm = self.llm.bind(max_tokens=self._GRADING_MAX_TOKENS, **grader_kwargs)
+        self._grading_chain = grading_prompt | grading_llm | JsonOutputParser()
+
+        sufficiency_prompt = ChatPromptTemplate.from_messages([
+            ("system", self._grade_sufficiency_system_prompt),
+            ("human", self._grade_human_prompt),
+        ])
+        sufficiency_llm = self.llm.bind(max_tokens=self._SUFFICIENCY_MAX_TOKENS, **grader_kwargs)
+        self._sufficiency_chain = sufficiency_prompt | sufficiency_llm | JsonOutputParser()
+
+    # Tag on the answer chain; stream_run forwards tokens from LLM calls carrying it
+    _ANSWER_STREAM_TAG = "rag_answer"
+
+    # Output caps for the JSON graders: ~20 tokens per graded document (top 5 retrieved), one flag for sufficiency
+    _GRADING_MAX_TOKENS = 256
+    _SUFFICIENCY_MAX_TOKENS = 16
+
+    # Prompts are split into a static system message and a dynamic human message. Keeping the
+    # instructions byte-identical at the start of every request lets Azure OpenAI reuse the
+    # cached prompt prefix; documents and the question always come last.
+    _answer_human_prompt = """**Conversation History:**\n{history}\n\n**Context Documents:**\n{context}\n\n**User's Question:**\n{question}\n\n**Your Answer:**\n"""
+
+    _grade_relevance_system_prompt = """You are a grader assessing the relevance of retrieved documents to a user question.\n\nRULES:\n- Grade each numbered document independently.\n- If a document contains keywords or semantic meaning relevant to the question, grade it as relevant.\n- If a document is not relevant, grade it as not relevant.\n- Give every document a 'score' from 1 (barely related) to 5 (directly answers the question).\n- Your response must be a single JSON object with a key 'grades' holding one entry per document, for example: {{"grades": [{{"idx": 0, "relevant": true, "score": 4}}, {{"idx": 1, "relevant": false, "score": 1}}]}}"""
+
+    _grade_sufficiency_system_prompt = """You are a grader assessing if a set of documents contains enough information to fully answer a user's question.\n\nRULES:\n- Evaluate if the combined information in the documents is sufficient to provide a complete and direct answer.\n- If yes, respond with a JSON object: {{"sufficient": true}}\n- If no, respond with a JSON object: {{"sufficient": false}}"""
+
+    _grade_human_prompt = """DOCUMENTS:\n{documents}\n\nQUESTION:\n{question}\n\nJSON RESPONSE:"""
+
+    async def _grade_and_rank_documents(self, documents: List[Document], question: str,
+                                        question_vector: Optional[List[float]] = None) -> List[Document]:
+        """
+        Grades and scores all documents in a single LLM call.
+        Irrelevant documents are dropped and the rest are ordered by score, most relevant first.
+        If grading fails or its output cannot be parsed, documents are kept in search order.
+        """
+        documents = await self._filter_by_embedding_similarity(documents, question, question_vector)
         if not documents:
             return []
 
-        prompt = PromptTemplate.from_template(self._grade_relevance_prompt_template)
-        grading_chain = prompt | self.llm | JsonOutputParser()
+        numbered_docs = "\n\n".join(f"[{i}] {_head(doc.page_content)}" for i, doc in enumerate(documents))
+        try:
+            result = await self._grading_chain.ainvoke({"documents": numbered_docs, "question": question})
+        except Exception:
+            self.logger.exception("Error grading documents, keeping them ungraded")
+            return documents
+
+        scores = self._parse_relevance_grades(result, len(documents))
+        if scores is None:
+            self.logger.warning("Could not parse relevance grades, keeping documents ungraded")
+            return documents
+        # sorted() is stable, so equally scored documents keep their search order
+        ranked_indices = sorted(scores, key=lambda i: (-scores[i], i))
+        return [documents[i] for i in ranked_indices]
+
+    async def _filter_by_embedding_similarity(self, documents: List[Document], question: str,
+                                              question_vector: Optional[List[float]] = None) -> List[Document]:
+        """
+        Drops documents whose embedding is far from the question's, so the LLM grader sees fewer documents.
+        Off by default; `question_vector` is reused when the question was already embedded.
+        """
+        threshold = settings.rag_grading_similarity_threshold
+        if not documents or threshold <= 0:
+            return documents
 
-        relevant_docs = []
+        try:
+            document_texts = [_head(doc.page_content) for doc in documents]
+            if question_vector is None:
+                question_vector, document_vectors = await asyncio.gather(
+                    self.embeddings.aembed_query(question),
+                    self.embeddings.aembed_documents(document_texts),
+                )
+            else:
+                document_vectors = await self.embeddings.aembed_documents(document_texts)
+        except Exception as e:
+            self.logger.warning("Embedding similarity gate skipped: %s", e)
+            return documents
+
+        query = np.asarray(question_vector, dtype=np.float32)
+        matrix = np.asarray(document_vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = (matrix @ query) / np.where(norms == 0, 1, norms)
+
+        kept = [doc for doc, similarity in zip(documents, similarities) if similarity >= threshold]
+        self.logger.info("Embedding gate kept %d of %d documents", len(kept), len(documents))
+        return kept
+
+    @staticmethod
+    def _deduplicate_documents(documents: List[Document]) -> List[Document]:
+        """Drops repeated chunks, keyed on chunk_id or a content hash, so each is graded only once."""
+        seen = set()
+        unique_docs = []
         for doc in documents:
+            key = doc.metadata.get("chunk_id") or hashlib.blake2b(doc.page_content.encode(), digest_size=16).digest()
+            if key not in seen:
+                seen.add(key)
+                unique_docs.append(doc)
+        return unique_docs
+
+    @staticmethod
+    def _parse_relevance_grades(result: Any, document_count: int) -> Optional[Dict[int, float]]:
+        """
+        Maps the index of each document graded relevant to its score, from the grader's JSON output.
+        Returns None when the output holds no usable grade at all, so callers can tell it from all-irrelevant.
+        """
+        grades = result.get("grades") if isinstance(result, dict) else result
+        if not isinstance(grades, list):
+            return None
+        scores = {}
+        graded_any = False
+        for grade in grades:
+            if not isinstance(grade, dict):
+                continue
             try:
-                result = grading_chain.invoke({"document": doc.page_content, "question": question})
-                if result.get("score") == "relevant":
-                    relevant_docs.append(doc)
-            except Exception as e:
-                print(f"Error grading document: {e}")
-        return relevant_docs
-
-    def _rerank_documents_for_context_sync(self, documents: List[Document], question: str) -> List[Document]:
-        """Re-ranks relevant documents to place the most relevant one first (placeholder)."""
-        return documents
-
-    def _are_documents_sufficient_for_answer_sync(self, documents: List[Document], question: str) -> bool:
+                idx = int(grade.get("idx"))
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= idx < document_count:
+                continue
+            graded_any = True
+            relevant = grade.get("relevant")
+            if isinstance(relevant, str):
+                relevant = relevant.strip().lower() in {"true", "relevant", "yes"}
+            if relevant is True:
+                try:
+                    scores[idx] = float(grade.get("score", 0))
+                except (TypeError, ValueError):
+                    scores[idx] = 0.0
+        return scores if graded_any else None
+
+    async def _are_documents_sufficient_for_answer(self, documents: List[Document], question: str) -> bool:
         """Checks if the provided documents are sufficient to answer the question."""
         if not documents:
             return False
 
-        prompt = PromptTemplate.from_template(self._grade_sufficiency_prompt_template)
-        sufficiency_chain = prompt | self.llm | JsonOutputParser()
-        
         formatted_docs = self._format_documents_for_context(documents)
 
         try:
-            result = sufficiency_chain.invoke({"documents": formatted_docs, "question": question})
+            result = await self._sufficiency_chain.ainvoke({"documents": formatted_docs, "question": question})
             return result.get("sufficient", False)
         except Exception as e:
-            print(f"Error checking document sufficiency: {e}")
+            self.logger.exception("Error checking document sufficiency")
             return False
 
     def _extract_contacts(self, documents: List[Document]) -> List[str]:
         """Extracts contact information (names, emails) from documents."""
-        contacts = []
-        email_pattern = r'[\w\.-]+@[\w\.-]+'
+        # dict keys de-duplicate while keeping document order, so the prompt lists contacts deterministically
+        contacts: Dict[str, None] = {}
         for doc in documents:
-            found_emails = re.findall(email_pattern, doc.page_content)
+            found_emails = _EMAIL_RE.findall(doc.page_content)
+            if not found_emails:
+                continue
+            # The contact name is the first "First Last" pair in the document, shared by its emails
+            name_search = _CONTACT_NAME_RE.search(doc.page_content)
             for email in found_emails:
-                name_search = re.search(f'([A-Z][a-z]+ [A-Z][a-z]+)(?=\s*\(?[<{email}>]?\)?)', doc.page_content)
                 if name_search:
-                    contacts.append(f"{name_search.group(1)} ({email})")
+                    contacts[f"{name_search.group(0)} ({email})"] = None
                 else:
-                    contacts.append(email)
-        return list(set(contacts))
+                    contacts[email] = None
+        return list(contacts)
 
     def _prepare_contact_info_for_prompt(self, contacts: List[str]) -> str:
         """Formats the list of contacts into a string for the prompt."""
@@ -543,6 +765,133 @@ From our procurement policies, I know that specialized purchases often require a
             context_str += f"Citation [{i+1}]:\n{doc.page_content}\n\n"
         return context_str
 
+    async def _get_cached_answer(self, question: str, conversation_memory: dict):
+        """
+        Returns a cached answer for first-turn questions, whose answers do not depend on history.
+
+        Tries an exact match first, then a semantic match on the question embedding. The
+        embedding is returned alongside the answer so a miss can be cached under it.
+        """
+        if conversation_memory.get("history") or self.response_cache.maxsize <= 0:
+            return None, None
+
+        cached = self.response_cache.get(question)
+        if cached is not None:
+            return cached, None
+
+        try:
+            question_vector = await self.embeddings.aembed_query(question)
+        except Exception as e:
+            self.logger.warning("Could not embed question for semantic cache lookup: %s", e)
+            return None, None
+        return self.response_cache.get_similar(question_vector), question_vector
+
+    @asynccontextmanager
+    async def _pipeline_slot(self, reservation: Optional[PipelineReservation] = None):
+        """
+        Holds one of the rag_max_concurrency graph-run slots, tracking active and queued runs.
+        A held `reservation` already counts as waiting, so it is claimed instead of counted again.
+        """
+        if reservation is None or not reservation.claim():
+            self._pipeline_waiting += 1
+        try:
+            await self._pipeline_slots.acquire()
+        finally:
+            self._pipeline_waiting -= 1
+        self._pipeline_active += 1
+        try:
+            yield
+        finally:
+            self._pipeline_active -= 1
+            self._pipeline_slots.release()
+
+    def pipeline_stats(self) -> Dict[str, int]:
+        """Returns current graph-run load, for health checks and admission control."""
+        return {
+            "active": self._pipeline_active,
+            "waiting": self._pipeline_waiting,
+            "max_concurrency": settings.rag_max_concurrency,
+            "max_queued": settings.rag_max_queued,
+        }
+
+    def is_saturated(self) -> bool:
+        """True when the wait queue for graph-run slots is full and new work should be refused."""
+        return 0 < settings.rag_max_queued <= self._pipeline_waiting
+
+    def reserve_pipeline_slot(self) -> Optional[PipelineReservation]:
+        """
+        Takes a place in the graph-run queue at admission time, or returns None when it is full.
+        Checking and counting happen together, so a burst of requests cannot all pass the check
+        before any of them is counted.
+        """
+        if self.is_saturated():
+            return None
+        self._pipeline_waiting += 1
+        return PipelineReservation(self)
+
+    async def can_answer_without_pipeline(self, question: str, conversation_id: Optional[str] = None) -> bool:
+        """True when the question would be served from the response cache or an identical in-flight run."""
+        self._initialize_models()
+        conversation_memory = await asyncio.to_thread(self.memory_service.load_conversation_memory, conversation_id)
+        if conversation_memory.get("history"):
+            return False
+        if self.response_cache.make_key(question) in self._inflight_answers:
+            return True
+        cached_state, _ = await self._get_cached_answer(question, conversation_memory)
+        return cached_state is not None
+
+    async def _join_or_lead_inflight(self, question: str, conversation_memory: dict,
+                                     reservation: Optional[PipelineReservation] = None):
+        """
+        Single-flight guard for cacheable questions that missed the cache.
+
+        If an identical first-turn question is already running, waits for it and returns its
+        final state. Otherwise registers this request as the one computing the answer and
+        returns its future, which must be passed to `_finish_inflight`. If the run being
+        waited on ends without an answer, the first follower to wake leads a new run and the
+        others wait on it. A follower gives back its `reservation` before waiting, so it does
+        not hold a queue place while another request does the work.
+        """
+        if conversation_memory.get("history"):
+            return None, None
+
+        key = self.response_cache.make_key(question)
+        while (pending := self._inflight_answers.get(key)) is not None:
+            if reservation is not None:
+                reservation.release()
+            # shield() so a cancelled follower does not cancel the shared future
+            shared_state = await asyncio.shield(pending)
+            if shared_state is not None:
+                return shared_state, None
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_answers[key] = future
+        return None, future
+
+    def _finish_inflight(self, question: str, future: Optional[asyncio.Future], final_state: Optional[Dict[str, Any]]):
+        """Releases a single-flight slot, waking waiters with the answer or None if there was none."""
+        if future is None:
+            return
+        key = self.response_cache.make_key(question)
+        if self._inflight_answers.get(key) is future:
+            del self._inflight_answers[key]
+        if not future.done():
+            future.set_result(final_state if final_state and final_state.get("generation") else None)
+
+    def _cache_answer(self, question: str, conversation_memory: dict, final_state: Dict[str, Any],
+                      question_vector: Optional[List[float]] = None):
+        """
+        Caches a generated answer so repeated first-turn questions skip the pipeline.
+        Fallback answers with no graded documents are not cached: they may come from a
+        transient search failure and would otherwise be served for the full TTL.
+        """
+        if conversation_memory.get("history") or not final_state.get("generation") or not final_state.get("documents"):
+            return
+        self.response_cache.put(question, {
+            "generation": final_state["generation"],
+            "documents": final_state.get("documents", []),
+        }, vector=question_vector)
+
     def _create_source_list(self, documents: List[Document]) -> List[Dict[str, Any]]:
         """Creates a list of source dictionaries from documents."""
         sources = []
@@ -553,6 +902,9 @@ From our procurement policies, I know that specialized purchases often require a
 
     def _log_workflow_event(self, event_type: str, event_data: Dict[str, Any]):
         """Logs structured workflow events for observability and dashboard integration."""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         log_entry = {
             "event_type": event_type,
             "agent_id": self.agent_id,
@@ -561,19 +913,20 @@ From our procurement policies, I know that specialized purchases often require a
         }
         
         # Log as structured JSON for easy parsing by observability tools
-        self.logger.info(f"WORKFLOW_EVENT: {json.dumps(log_entry)}")
+        self.logger.info("WORKFLOW_EVENT: %s", orjson.dumps(log_entry, default=str).decode())
         
-        # Also print for immediate visibility during development
-        print(f"[{event_type.upper()}] {json.dumps(event_data, indent=2)}")
+        # Pretty-printed copy for development, dropped at zero cost outside DEBUG
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("[%s] %s", event_type.upper(), orjson.dumps(event_data, default=str, option=orjson.OPT_INDENT_2).decode())
     
-    def _update_conversation_memory(self, conversation_id: str, question: str, final_state: RAGGraphState):
+    async def _update_conversation_memory(self, conversation_id: str, question: str, final_state: RAGGraphState):
         """Updates the conversation memory with the latest interaction in a structured format for persistence."""
         # Create structured memory entry for future persistence
         memory_entry = {
             "question": question,
             "answer": final_state.get("generation", ""),
             "sources": self._create_source_list(final_state.get("documents", [])),
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _iso_now(),
             "metadata": {
                 "document_count": len(final_state.get("documents", [])),
                 "response_length": len(final_state.get("generation", "")),
@@ -584,25 +937,29 @@ From our procurement policies, I know that specialized purchases often require a
         # Log memory operation for observability
         self._log_workflow_event("memory_save_attempt", {
             "conversation_id": conversation_id,
-            "entry_size": len(json.dumps(memory_entry)),
-            "timestamp": datetime.now().isoformat()
+            "entry_size": len(orjson.dumps(memory_entry)),
+            "timestamp": _iso_now()
         })
         
-        # Save to current memory service (can be easily migrated to persistent storage)
-        self.memory_service.save_conversation_memory(memory_entry, conversation_id)
+        # Save to current memory service (can be easily migrated to persistent storage);
+        # the file write runs in a worker thread so it does not block the event loop
+        await asyncio.to_thread(self.memory_service.save_conversation_memory, memory_entry, conversation_id)
 
     def _validate_input(self, state: AgentState) -> bool:
         """Validates the input state to ensure it contains a valid question."""
         question = state.data.get("question", "")
         return isinstance(question, str) and bool(question.strip())
 
+    # Fixed for the agent's lifetime, so defined once rather than rebuilt on every call
+    _CAPABILITIES = (
+        "procurement_qa",
+        "policy_lookup",
+        "contact_information",
+    )
+
     def get_capabilities(self) -> List[str]:
         """Returns a list of the agent's capabilities."""
-        return [
-            "procurement_qa",
-            "policy_lookup",
-            "contact_information"
-        ]
+        return list(self._CAPABILITIES)
 
         # Intelligent detection of when email assistance is genuinely needed
         def should_offer_email_assistance(question: str, documents: List[Document]) -> bool:
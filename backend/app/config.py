@@ -1,6 +1,10 @@
+import re
 from pydantic_settings import BaseSettings
 from typing import Optional
 
+# Service name from an endpoint like https://service-name.search.windows.net/
+_SEARCH_SERVICE_RE = re.compile(r'https://([^.]+)\.search\.windows\.net')
+
 class Settings(BaseSettings):
     model_config = {
         "extra": "ignore",  # Ignore extra environment variables
@@ -11,6 +15,8 @@ class Settings(BaseSettings):
     debug: bool = False
     host: str = "0.0.0.0"
     port: int = 8000
+    warmup_on_startup: bool = True  # Prime Azure clients at startup to avoid first-request latency
+    warmup_timeout_seconds: float = 20  # Startup gives up on warmup after this long
     
     # Application Settings
     app_env: str = "development"
@@ -39,6 +45,21 @@ class Settings(BaseSettings):
     azure_search_api_key: Optional[str] = None
     azure_search_index_name: Optional[str] = None
     
+    # RAG response cache (set rag_cache_max_entries to 0 to disable)
+    rag_cache_max_entries: int = 1024
+    rag_cache_ttl_seconds: int = 3600
+    rag_cache_similarity_threshold: float = 0.95
+    
+    # Documents whose embedding similarity to the question falls below this are dropped
+    # before LLM grading (0 disables the gate). It costs an extra embedding round-trip, and
+    # text-embedding-ada-002 scores mostly sit above 0.7, so tune it before enabling.
+    rag_grading_similarity_threshold: float = 0
+
+    # Maximum RAG pipeline runs in flight at once; extra requests wait for a free slot
+    rag_max_concurrency: int = 8
+    # Requests are rejected with 429 once this many are already waiting for a slot (0 disables)
+    rag_max_queued: int = 32
+    
     # Microsoft Teams Configuration
     teams_app_id: Optional[str] = None
     teams_app_password: Optional[str] = None
@@ -77,9 +98,7 @@ class Settings(BaseSettings):
     def azure_search_service(self) -> Optional[str]:
         # Extract service name from endpoint
         if self.azure_search_endpoint:
-            # Extract from https://service-name.search.windows.net/
-            import re
-            match = re.search(r'https://([^.]+)\.search\.windows\.net', self.azure_search_endpoint)
+            match = _SEARCH_SERVICE_RE.search(self.azure_search_endpoint)
             return match.group(1) if match else None
         return None
     
@@ -5,11 +5,14 @@ This module defines the routes for querying the RAG agent, including the
 streaming endpoint for real-time responses.
 """
 
+import asyncio
 import logging
 from functools import lru_cache
-from typing import AsyncGenerator
+from typing import AsyncGenerator, AsyncIterable, Optional
 
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
+from starlette.background import BackgroundTask
 from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 
 from ..agents.rag_agent import RAGAgent
@@ -21,6 +24,118 @@ logger = logging.getLogger(__name__)
 # Create a new router for the agent endpoints
 router = APIRouter()
 
+# Idle streams get a comment line every SSE_PING_SECONDS so proxies keep the connection open;
+# the event is built once instead of formatting a timestamped comment on every ping
+SSE_PING_SECONDS = 15
+_KEEPALIVE_EVENT = ServerSentEvent(comment="keepalive")
+
+
+def _build_sse_frame(data: str, event: Optional[bytes] = None) -> bytes:
+    """
+    Encodes one SSE message directly to bytes.
+
+    Every line of `data` becomes its own `data:` field, including empty lines, so clients
+    reassemble the text exactly; newline-only tokens survive streaming intact.
+    """
+    frame = b"event: " + event + b"\n" if event else b""
+    for line in data.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        frame += b"data: " + line.encode() + b"\n"
+    return frame + b"\n"
+
+
+# Clients turned away while the RAG pipeline queue is full are asked to retry after this long
+RETRY_AFTER_SECONDS = 5
+
+
+# Tokens are merged into one SSE frame until the frame holds this many characters or the
+# oldest buffered token has waited this long, so clients get far fewer, larger sends
+SSE_COALESCE_MAX_CHARS = 4096
+SSE_COALESCE_MAX_DELAY_SECONDS = 0.02
+# Chunks read ahead of the client are capped, so a slow client still holds the source back
+SSE_COALESCE_QUEUE_SIZE = 256
+
+# Posted by the reader task once the source is exhausted or has failed
+_END_OF_STREAM = object()
+
+
+async def _coalesce_chunks(
+    chunks: AsyncIterable[str],
+    max_chars: int = SSE_COALESCE_MAX_CHARS,
+    max_delay: float = SSE_COALESCE_MAX_DELAY_SECONDS,
+    queue_size: int = SSE_COALESCE_QUEUE_SIZE,
+) -> AsyncGenerator[str, None]:
+    """
+    Merges adjacent chunks from `chunks`, flushing on size, on delay, and at the end.
+
+    One reader task drains the source into a bounded queue and a loop timer posts a flush
+    marker into the same queue, so no task is created per chunk.
+    """
+    iterator = chunks.__aiter__()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    failures = []
+
+    async def read_source():
+        try:
+            async for chunk in iterator:
+                await queue.put(chunk)
+        except Exception as e:
+            failures.append(e)
+        await queue.put(_END_OF_STREAM)
+
+    def post_flush(marker: object):
+        try:
+            queue.put_nowait(marker)
+        except asyncio.QueueFull:
+            # The queue is backed up, so the deadline check after the next chunk flushes instead
+            pass
+
+    reader = asyncio.ensure_future(read_source())
+    buffer = []
+    buffered_chars = 0
+    flush_at = 0.0
+    flush_marker = None
+    flush_timer = None
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, str):
+                if not buffer:
+                    flush_at = loop.time() + max_delay
+                    flush_marker = object()
+                    flush_timer = loop.call_at(flush_at, post_flush, flush_marker)
+                buffer.append(item)
+                buffered_chars += len(item)
+                if buffered_chars < max_chars and loop.time() < flush_at:
+                    continue
+            elif item is not flush_marker:
+                # Marker from a timer whose buffer was already flushed on size
+                continue
+
+            flush_timer.cancel()
+            flush_marker = None
+            yield "".join(buffer)
+            buffer.clear()
+            buffered_chars = 0
+
+        if buffer:
+            yield "".join(buffer)
+        if failures:
+            raise failures[0]
+    finally:
+        # Stop reading and close the source now rather than at garbage collection, so its
+        # cleanup (pipeline slot release, single-flight hand-off) runs as soon as the client goes away
+        if flush_timer is not None:
+            flush_timer.cancel()
+        reader.cancel()
+        # wait() does not re-raise the task's outcome, so the cancellation is simply absorbed
+        await asyncio.wait({reader})
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
 
 @lru_cache
 def get_rag_agent() -> RAGAgent:
@@ -49,18 +164,42 @@ async def stream_query(
 
     Returns:
         An EventSourceResponse that streams the agent's response.
+
+    Raises:
+        HTTPException: 429 when the agent's pipeline queue is already full and the answer is
+            not available from the cache or an identical in-flight request.
     """
+    # Reserve before any await so concurrent requests cannot all pass a stale check
+    reservation = rag_agent.reserve_pipeline_slot()
+    if reservation is None and not await rag_agent.can_answer_without_pipeline(
+        request.question, request.conversation_id
+    ):
+        logger.warning("Rejecting query for conversation %s: RAG pipeline queue is full", request.conversation_id)
+        raise HTTPException(
+            status_code=429,
+            detail="The assistant is busy, please retry shortly.",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
 
-    async def stream_generator() -> AsyncGenerator[ServerSentEvent, None]:
-        """An async generator that yields Server-Sent Events."""
+    async def stream_generator() -> AsyncGenerator[bytes, None]:
+        """An async generator that yields pre-encoded Server-Sent Event frames."""
         try:
-            async for chunk in rag_agent.stream_run(
-                question=request.question, conversation_id=request.conversation_id
-            ):
-                yield ServerSentEvent(data=chunk)
+            async for chunk in _coalesce_chunks(rag_agent.stream_run(
+                question=request.question, conversation_id=request.conversation_id, reservation=reservation
+            )):
+                yield _build_sse_frame(chunk)
         except Exception as e:
-            logger.error(f"Error during stream for conversation {request.conversation_id}: {e}", exc_info=True)
+            logger.error("Error during stream for conversation %s: %s", request.conversation_id, e, exc_info=True)
             error_message = {"error": "An unexpected error occurred.", "details": str(e)}
-            yield ServerSentEvent(data=str(error_message), event="error")
+            yield _build_sse_frame(orjson.dumps(error_message).decode(), event=b"error")
+        finally:
+            if reservation is not None:
+                reservation.release()
 
-    return EventSourceResponse(stream_generator())
+    return EventSourceResponse(
+        stream_generator(),
+        ping=SSE_PING_SECONDS,
+        ping_message_factory=lambda: _KEEPALIVE_EVENT,
+        # Covers responses whose body is never iterated, e.g. the client left before it started
+        background=BackgroundTask(reservation.release) if reservation is not None else None,
+    )
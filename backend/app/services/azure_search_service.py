@@ -3,12 +3,16 @@ Azure Search Service for document retrieval.
 Migrated from notebook code with improved modularity.
 """
 
+import asyncio
+import httpx
 import requests
 import json
 import logging
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 
+from .llm_service import get_async_http_client
+
 
 class AdaptiveHybridAzureSearchRetriever:
     """
@@ -26,18 +30,40 @@ class AdaptiveHybridAzureSearchRetriever:
             'Content-Type': 'application/json',
             'api-key': search_key
         }
+        # Reuse one pooled session so repeated searches skip the TCP/TLS handshake
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
         self.semantic_available = None  # Will be detected on first use
         self.logger = logging.getLogger(__name__)
     
+    @property
+    def _index_url(self) -> str:
+        return f"https://{self.search_service}.search.windows.net/indexes/{self.index_name}?api-version=2023-11-01"
+
     def _check_semantic_availability(self) -> bool:
         """Check if semantic search is configured for this index"""
         if self.semantic_available is not None:
             return self.semantic_available
             
         # Get index configuration to check for semantic search
-        index_url = f"https://{self.search_service}.search.windows.net/indexes/{self.index_name}?api-version=2023-11-01"
-        response = requests.get(index_url, headers=self.headers)
-        
+        response = self.session.get(self._index_url)
+        return self._record_semantic_availability(response)
+
+    async def _acheck_semantic_availability(self) -> bool:
+        """Async variant of `_check_semantic_availability` using the shared async HTTP client"""
+        if self.semantic_available is not None:
+            return self.semantic_available
+
+        try:
+            response = await get_async_http_client().get(self._index_url, headers=self.headers)
+        except httpx.HTTPError as e:
+            # Not cached, so the check is retried on the next search
+            self.logger.warning("Could not check semantic config (%s) - using standard hybrid search", e)
+            return False
+        return self._record_semantic_availability(response)
+
+    def _record_semantic_availability(self, response) -> bool:
+        """Cache whether the index has a semantic configuration, from the index definition response"""
         if response.status_code == 200:
             index_config = response.json()
             semantic_config = index_config.get('semantic', {})
@@ -46,7 +72,7 @@ class AdaptiveHybridAzureSearchRetriever:
             if configurations:
                 self.semantic_available = True
                 self.semantic_config_name = configurations[0].get('name', 'default')
-                self.logger.info(f"Semantic search detected - using config: {self.semantic_config_name}")
+                self.logger.info("Semantic search detected - using config: %s", self.semantic_config_name)
             else:
                 self.semantic_available = False
                 self.logger.info("No semantic search configured - using standard hybrid search")
@@ -65,7 +91,55 @@ class AdaptiveHybridAzureSearchRetriever:
         # Check semantic availability
         has_semantic = self._check_semantic_availability()
         
-        # Build search body - start with hybrid (vector + keyword)
+        search_body = self._build_hybrid_search_body(query, query_embedding, has_semantic)
+        response = self.session.post(f"{self.search_url}?api-version=2023-11-01", json=search_body)
+        
+        if response.status_code == 200:
+            return self._parse_hybrid_results(response.json(), has_semantic)
+        else:
+            # Fallback to vector-only search if hybrid fails
+            self.logger.warning("Hybrid search failed (%s), falling back to vector-only", response.status_code)
+            return self._vector_only_search(query_embedding)
+
+    async def ainvoke(self, query: str, query_embedding: Optional[List[float]] = None) -> List[Document]:
+        """
+        Async ADAPTIVE HYBRID search; the query embedding and semantic check run concurrently.
+        Pass `query_embedding` when the query has already been embedded to skip that call.
+        """
+        if query_embedding is None:
+            query_embedding, has_semantic = await asyncio.gather(
+                self.embeddings.aembed_query(query),
+                self._acheck_semantic_availability(),
+            )
+        else:
+            has_semantic = await self._acheck_semantic_availability()
+
+        search_body = self._build_hybrid_search_body(query, query_embedding, has_semantic)
+        try:
+            response = await get_async_http_client().post(
+                f"{self.search_url}?api-version=2023-11-01", json=search_body, headers=self.headers
+            )
+            if response.status_code == 200:
+                return self._parse_hybrid_results(response.json(), has_semantic)
+            failure = response.status_code
+        except httpx.HTTPError as e:
+            failure = e
+
+        # Fallback to vector-only search if hybrid fails or times out
+        self.logger.warning("Hybrid search failed (%s), falling back to vector-only", failure)
+        try:
+            response = await get_async_http_client().post(
+                f"{self.search_url}?api-version=2023-11-01",
+                json=self._build_vector_search_body(query_embedding),
+                headers=self.headers,
+            )
+        except httpx.HTTPError as e:
+            self.logger.error("Vector search also failed: %s", e)
+            return []
+        return self._parse_vector_results(response)
+
+    def _build_hybrid_search_body(self, query: str, query_embedding: List[float], has_semantic: bool) -> dict:
+        """Build the hybrid (vector + keyword) search request, adding semantic ranking when available"""
         search_body = {
             "search": query,  # Keyword/BM25 search component
             "vectorQueries": [{
@@ -86,48 +160,45 @@ class AdaptiveHybridAzureSearchRetriever:
                 "captions": "extractive",  # Get highlighted captions
                 "answers": "extractive"   # Get direct answers when possible
             })
+        return search_body
+
+    def _parse_hybrid_results(self, results: dict, has_semantic: bool) -> List[Document]:
+        """Convert a hybrid search response into documents"""
+        documents = []
         
-        response = requests.post(f"{self.search_url}?api-version=2023-11-01", 
-                               headers=self.headers, 
-                               json=search_body)
+        search_type = "SEMANTIC HYBRID" if has_semantic else "STANDARD HYBRID"
+        self.logger.info("%s SEARCH SUCCESS - Combined vector + keyword search", search_type)
         
-        if response.status_code == 200:
-            results = response.json()
-            documents = []
-            
-            search_type = "SEMANTIC HYBRID" if has_semantic else "STANDARD HYBRID"
-            self.logger.info(f"{search_type} SEARCH SUCCESS - Combined vector + keyword search")
+        for doc in results.get('value', []):
+            # Extract captions if available (semantic search feature)
+            captions = doc.get('@search.captions', [])
+            caption_text = captions[0].get('text', '') if captions else ''
             
-            for doc in results.get('value', []):
-                # Extract captions if available (semantic search feature)
-                captions = doc.get('@search.captions', [])
-                caption_text = captions[0].get('text', '') if captions else ''
-                
-                document = Document(
-                    page_content=doc.get('chunk', ''),
-                    metadata={
-                        'chunk_id': doc.get('chunk_id', ''),
-                        'title': doc.get('title', ''),
-                        'parent_id': doc.get('parent_id', ''),
-                        'source': doc.get('title', 'Azure Search'),
-                        'search_score': doc.get('@search.score', 0),
-                        'reranker_score': doc.get('@search.rerankerScore', 0) if has_semantic else 0,
-                        'caption': caption_text
-                    }
-                )
-                documents.append(document)
-            
-            return documents
-        else:
-            # Fallback to vector-only search if hybrid fails
-            self.logger.warning(f"Hybrid search failed ({response.status_code}), falling back to vector-only")
-            return self._vector_only_search(query)
-    
-    def _vector_only_search(self, query: str) -> List[Document]:
-        """Fallback vector-only search"""
-        query_embedding = self.embeddings.embed_query(query)
+            document = Document(
+                page_content=doc.get('chunk', ''),
+                metadata={
+                    'chunk_id': doc.get('chunk_id', ''),
+                    'title': doc.get('title', ''),
+                    'parent_id': doc.get('parent_id', ''),
+                    'source': doc.get('title', 'Azure Search'),
+                    'search_score': doc.get('@search.score', 0),
+                    'reranker_score': doc.get('@search.rerankerScore', 0) if has_semantic else 0,
+                    'caption': caption_text
+                }
+            )
+            documents.append(document)
         
-        search_body = {
+        return documents
+    
+    def _vector_only_search(self, query_embedding: List[float]) -> List[Document]:
+        """Fallback vector-only search, reusing the embedding computed for the hybrid query"""
+        search_body = self._build_vector_search_body(query_embedding)
+        response = self.session.post(f"{self.search_url}?api-version=2023-11-01", json=search_body)
+        return self._parse_vector_results(response)
+
+    @staticmethod
+    def _build_vector_search_body(query_embedding: List[float]) -> dict:
+        return {
             "vectorQueries": [{
                 "kind": "vector",
                 "vector": query_embedding,
@@ -136,11 +207,9 @@ class AdaptiveHybridAzureSearchRetriever:
             }],
             "select": "chunk_id,chunk,title,parent_id"
         }
-        
-        response = requests.post(f"{self.search_url}?api-version=2023-11-01", 
-                               headers=self.headers, 
-                               json=search_body)
-        
+
+    def _parse_vector_results(self, response) -> List[Document]:
+        """Convert a vector-only search response into documents"""
         if response.status_code == 200:
             results = response.json()
             documents = []
@@ -161,5 +230,5 @@ class AdaptiveHybridAzureSearchRetriever:
             
             return documents
         else:
-            self.logger.error(f"Vector search also failed: {response.status_code}")
+            self.logger.error("Vector search also failed: %s", response.status_code)
             return []
@@ -0,0 +1,68 @@
+"""
+Shared Azure OpenAI clients.
+All agents reuse one chat model, one embeddings model and one pooled HTTP client,
+so connections and TLS sessions are shared instead of opened per agent.
+"""
+
+import logging
+from functools import lru_cache
+
+import httpx
+from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# httpx defaults to a 5s timeout, too short for semantic/hybrid search; the OpenAI SDK sets its own per request
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+
+@lru_cache
+def get_http_client() -> httpx.Client:
+    """Pooled synchronous HTTP client shared by all Azure OpenAI calls."""
+    return httpx.Client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+@lru_cache
+def get_async_http_client() -> httpx.AsyncClient:
+    """Pooled asynchronous HTTP client shared by all Azure OpenAI calls."""
+    return httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+@lru_cache
+def get_chat_llm() -> AzureChatOpenAI:
+    """Returns the shared Azure OpenAI chat model, creating it on first use."""
+    logger.info("Initializing shared AzureChatOpenAI client...")
+    return AzureChatOpenAI(
+        azure_endpoint=settings.azure_openai_chat_endpoint,
+        api_key=settings.azure_openai_chat_key,
+        deployment_name=settings.azure_openai_chat_deployment,
+        api_version=settings.azure_openai_api_version,
+        temperature=0.1,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
+
+@lru_cache
+def get_embeddings() -> AzureOpenAIEmbeddings:
+    """Returns the shared Azure OpenAI embeddings model, creating it on first use."""
+    logger.info("Initializing shared AzureOpenAIEmbeddings client...")
+    return AzureOpenAIEmbeddings(
+        azure_endpoint=settings.azure_openai_embedding_endpoint,
+        api_key=settings.azure_openai_embedding_key,
+        azure_deployment=settings.azure_openai_embedding_deployment,
+        api_version=settings.azure_openai_api_version,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+    )
+
+
+async def close_http_clients():
+    """Closes the shared HTTP clients; call on application shutdown."""
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
@@ -3,12 +3,19 @@ Memory service for managing conversation history.
 Provides persistent storage for agent conversations.
 """
 
+import copy
 import json
 import os
 import logging
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+# Stored answers are capped at this many characters. Prompt builders read at most the first
+# 200 (get_recent_context, query rewriting), so this keeps ample margin while bounding the
+# file that is rewritten and deep-copied on every save and load
+MAX_STORED_ANSWER_CHARS = 2048
+
 
 class ConversationMemoryService:
     """Service for managing conversation memory across agent interactions"""
@@ -18,6 +25,11 @@ class ConversationMemoryService:
         self.memory_dir = os.path.dirname(os.path.abspath(memory_file))
         self.logger = logging.getLogger(__name__)
         
+        # Parsed file contents, reused until the file's mtime/size changes
+        self._cache: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+        # Serializes read-modify-write cycles when called from worker threads
+        self._lock = threading.Lock()
+        
         # Ensure memory directory exists
         if self.memory_dir and not os.path.exists(self.memory_dir):
             os.makedirs(self.memory_dir)
@@ -33,14 +45,12 @@ class ConversationMemoryService:
             Dictionary containing conversation history
         """
         try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    all_memories = json.load(f)
-                    return all_memories.get(conversation_id, {"history": []})
-            else:
-                return {"history": []}
+            with self._lock:
+                all_memories = self._read_all_memories()
+                # Hand out a copy so callers cannot mutate the cached contents
+                return copy.deepcopy(all_memories.get(conversation_id, {"history": []}))
         except (FileNotFoundError, json.JSONDecodeError) as e:
-            self.logger.error(f"Error loading conversation memory: {e}")
+            self.logger.error("Error loading conversation memory: %s", e)
             return {"history": []}
     
     def save_conversation_memory(self, memory: Dict[str, Any], conversation_id: str = "default"):
@@ -52,44 +62,69 @@ class ConversationMemoryService:
             conversation_id: Unique identifier for the conversation
         """
         try:
-            # Load existing memories
-            all_memories = {}
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    all_memories = json.load(f)
-            
-            # Get or create conversation history structure
-            if conversation_id not in all_memories:
-                all_memories[conversation_id] = {"history": []}
-            elif "history" not in all_memories[conversation_id]:
-                # Handle legacy format - convert flat entry to history array
-                legacy_entry = all_memories[conversation_id]
-                if "question" in legacy_entry and "answer" in legacy_entry:
-                    all_memories[conversation_id] = {
-                        "history": [{
-                            "question": legacy_entry["question"],
-                            "answer": legacy_entry["answer"]
-                        }]
-                    }
-                else:
-                    all_memories[conversation_id] = {"history": []}
-            
-            # Append new memory entry to history
-            history_entry = {
-                "question": memory.get("question", ""),
-                "answer": memory.get("answer", "")
-            }
-            all_memories[conversation_id]["history"].append(history_entry)
-            
-            # Keep only last 10 entries to prevent memory bloat
-            all_memories[conversation_id]["history"] = all_memories[conversation_id]["history"][-10:]
-            
-            # Save back to file
-            with open(self.memory_file, 'w') as f:
-                json.dump(all_memories, f, indent=2)
-                
+            with self._lock:
+                self._save_entry(memory, conversation_id)
         except Exception as e:
-            self.logger.error(f"Error saving conversation memory: {e}")
+            self._cache = None
+            self.logger.error("Error saving conversation memory: %s", e)
+    
+    def _save_entry(self, memory: Dict[str, Any], conversation_id: str):
+        """Append a history entry and write the file; caller must hold the lock"""
+        # Load existing memories
+        all_memories = self._read_all_memories()
+        
+        # Get or create conversation history structure
+        if conversation_id not in all_memories:
+            all_memories[conversation_id] = {"history": []}
+        elif "history" not in all_memories[conversation_id]:
+            # Handle legacy format - convert flat entry to history array
+            legacy_entry = all_memories[conversation_id]
+            if "question" in legacy_entry and "answer" in legacy_entry:
+                all_memories[conversation_id] = {
+                    "history": [{
+                        "question": legacy_entry["question"],
+                        "answer": legacy_entry["answer"]
+                    }]
+                }
+            else:
+                all_memories[conversation_id] = {"history": []}
+        
+        # Append new memory entry to history
+        history_entry = {
+            "question": memory.get("question", ""),
+            "answer": memory.get("answer", "")[:MAX_STORED_ANSWER_CHARS]
+        }
+        all_memories[conversation_id]["history"].append(history_entry)
+        
+        # Keep only last 10 entries to prevent memory bloat
+        all_memories[conversation_id]["history"] = all_memories[conversation_id]["history"][-10:]
+        
+        # Save back to file
+        self._write_all_memories(all_memories)
+    
+    def _read_all_memories(self) -> Dict[str, Any]:
+        """
+        Read all conversations from the memory file.
+        The parsed contents are reused while the file's mtime and size are unchanged.
+        """
+        try:
+            stat = os.stat(self.memory_file)
+        except FileNotFoundError:
+            self._cache = None
+            return {}
+        
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._cache is None or self._cache[0] != signature:
+            with open(self.memory_file, 'r') as f:
+                self._cache = (signature, json.load(f))
+        return self._cache[1]
+    
+    def _write_all_memories(self, all_memories: Dict[str, Any]):
+        """Write all conversations to the memory file and refresh the read cache"""
+        with open(self.memory_file, 'w') as f:
+            json.dump(all_memories, f, indent=2)
+        stat = os.stat(self.memory_file)
+        self._cache = ((stat.st_mtime_ns, stat.st_size), all_memories)
     
     def add_interaction(self, question: str, answer: str, conversation_id: str = "default", 
                        metadata: Dict[str, Any] = None):
@@ -106,7 +141,7 @@ class ConversationMemoryService:
         
         interaction = {
             "question": question,
-            "answer": answer,
+            "answer": answer[:MAX_STORED_ANSWER_CHARS],
             "timestamp": datetime.now().isoformat(),
             "metadata": metadata or {}
         }
@@ -148,18 +183,18 @@ class ConversationMemoryService:
             conversation_id: Unique identifier for the conversation
         """
         try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    all_memories = json.load(f)
-                
-                if conversation_id in all_memories:
-                    del all_memories[conversation_id]
-                
-                with open(self.memory_file, 'w') as f:
-                    json.dump(all_memories, f, indent=2)
+            with self._lock:
+                if os.path.exists(self.memory_file):
+                    all_memories = self._read_all_memories()
+                    
+                    if conversation_id in all_memories:
+                        del all_memories[conversation_id]
+                    
+                    self._write_all_memories(all_memories)
                     
         except Exception as e:
-            self.logger.error(f"Error clearing conversation memory: {e}")
+            self._cache = None
+            self.logger.error("Error clearing conversation memory: %s", e)
     
     def get_all_conversations(self) -> List[str]:
         """
@@ -169,12 +204,8 @@ class ConversationMemoryService:
             List of conversation IDs
         """
         try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r') as f:
-                    all_memories = json.load(f)
-                    return list(all_memories.keys())
-            else:
-                return []
+            with self._lock:
+                return list(self._read_all_memories().keys())
         except Exception as e:
-            self.logger.error(f"Error getting conversation list: {e}")
+            self.logger.error("Error getting conversation list: %s", e)
             return []
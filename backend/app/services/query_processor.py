@@ -5,12 +5,61 @@ Integrated from python-script-testing.py
 """
 
 import logging
+import re
 from typing import Dict, Any, List
 from langchain_core.output_parsers import StrOutputParser
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import AzureChatOpenAI
 
 
+# Static rewrite instructions are sent as the system message so the prompt prefix is
+# identical across requests and eligible for provider-side prompt caching.
+_REWRITE_SYSTEM_PROMPT = """You are a query rewriter for a University of Washington procurement assistant.
+
+STRICT RULES:
+1. ONLY rewrite queries related to procurement, purchasing, vendors, policies, or university business processes.
+2. If the current question is NOT procurement-related, return it UNCHANGED.
+3. If there's no relevant conversation history, return the question UNCHANGED.
+4. When rewriting, incorporate relevant context from the conversation history to make the query more specific and searchable.
+5. Keep the rewritten query focused and concise.
+
+INSTRUCTIONS:
+- If this question is about procurement/purchasing/vendors/policies, rewrite it to be more specific using conversation context
+- If this question is NOT about procurement (e.g., weather, personal topics, general knowledge), return it exactly as-is
+- Focus on making procurement-related queries more searchable and specific"""
+
+_REWRITE_HUMAN_PROMPT = """CONVERSATION HISTORY:
+{history}
+
+CURRENT QUESTION: {question}
+
+REWRITTEN QUERY:"""
+
+# Short questions are only rewritten when they point back at the conversation ("what about that?")
+_SHORT_QUESTION_MAX_WORDS = 3
+_FOLLOW_UP_RE = re.compile(
+    r"\b(it|its|that|this|these|those|they|them|their|there|he|she|his|her|same|above|previous|else|more)\b",
+    re.IGNORECASE,
+)
+
+# Keywords are matched as substrings, case-insensitively, in one pass over the question
+_PROCUREMENT_KEYWORDS = [
+    "procurement", "purchase", "buy", "buying", "vendor", "supplier", 
+    "contract", "contracting", "requisition", "order", "ordering",
+    "approval", "policy", "policies", "process", "procedure",
+    "requirement", "requirements", "budget", "budgeting", "cost",
+    "expense", "invoice", "invoicing", "payment", "bid", "bidding",
+    "rfp", "rfq", "proposal", "quote", "quotation", "sourcing",
+    "acquisition", "acquire", "university", "uw", "department"
+]
+_PROCUREMENT_KEYWORDS_RE = re.compile("|".join(map(re.escape, _PROCUREMENT_KEYWORDS)), re.IGNORECASE)
+
+_REWRITE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _REWRITE_SYSTEM_PROMPT),
+    ("human", _REWRITE_HUMAN_PROMPT),
+])
+
+
 class QueryProcessor:
     """
     Advanced query processing with context-aware rewriting and conversation history integration
@@ -18,6 +67,7 @@ class QueryProcessor:
     
     def __init__(self, llm: AzureChatOpenAI):
         self.llm = llm
+        self.rewrite_chain = _REWRITE_PROMPT | llm | StrOutputParser()
         self.logger = logging.getLogger(__name__)
     
     async def rewrite_query(self, question: str, conversation_memory: Dict[str, Any]) -> str:
@@ -32,6 +82,11 @@ class QueryProcessor:
         if not history:
             self.logger.info("No conversation history - using original query")
             return question
+
+        # A short self-contained query (e.g. "P-card limit?") gains nothing from a rewrite round-trip
+        if len(question.split()) <= _SHORT_QUESTION_MAX_WORDS and not _FOLLOW_UP_RE.search(question):
+            self.logger.info("Short standalone question - using original query")
+            return question
         
         # Get recent conversation context (last 2 exchanges)
         recent_history = history[-2:] if len(history) >= 2 else history
@@ -47,33 +102,8 @@ class QueryProcessor:
                 truncated_answer = assistant_a[:200] + "..." if len(assistant_a) > 200 else assistant_a
                 history_context += f"Previous Answer: {truncated_answer}\n"
         
-        rewrite_prompt = PromptTemplate(
-            template="""You are a query rewriter for a University of Washington procurement assistant.
-
-            STRICT RULES:
-            1. ONLY rewrite queries related to procurement, purchasing, vendors, policies, or university business processes.
-            2. If the current question is NOT procurement-related, return it UNCHANGED.
-            3. If there's no relevant conversation history, return the question UNCHANGED.
-            4. When rewriting, incorporate relevant context from the conversation history to make the query more specific and searchable.
-            5. Keep the rewritten query focused and concise.
-
-            CONVERSATION HISTORY:
-            {history}
-
-            CURRENT QUESTION: {question}
-
-            INSTRUCTIONS:
-            - If this question is about procurement/purchasing/vendors/policies, rewrite it to be more specific using conversation context
-            - If this question is NOT about procurement (e.g., weather, personal topics, general knowledge), return it exactly as-is
-            - Focus on making procurement-related queries more searchable and specific
-
-            REWRITTEN QUERY:""",
-            input_variables=["question", "history"],
-        )
-        
         try:
-            rewrite_chain = rewrite_prompt | self.llm | StrOutputParser()
-            rewritten_query = await rewrite_chain.ainvoke({
+            rewritten_query = await self.rewrite_chain.ainvoke({
                 "question": question,
                 "history": history_context
             })
@@ -86,32 +116,20 @@ class QueryProcessor:
                 self.logger.warning("Rewritten query too short - using original")
                 return question
             
-            self.logger.info(f"Original: {question}")
-            self.logger.info(f"Rewritten: {rewritten_query}")
+            self.logger.info("Original: %s", question)
+            self.logger.info("Rewritten: %s", rewritten_query)
             
             return rewritten_query
             
         except Exception as e:
-            self.logger.error(f"Error rewriting query: {e}")
+            self.logger.error("Error rewriting query: %s", e)
             return question  # Fallback to original query
     
     def is_procurement_related(self, question: str) -> bool:
         """
         Check if a question is procurement-related using keyword indicators.
         """
-        question_lower = question.lower()
-        
-        procurement_keywords = [
-            "procurement", "purchase", "buy", "buying", "vendor", "supplier", 
-            "contract", "contracting", "requisition", "order", "ordering",
-            "approval", "policy", "policies", "process", "procedure",
-            "requirement", "requirements", "budget", "budgeting", "cost",
-            "expense", "invoice", "invoicing", "payment", "bid", "bidding",
-            "rfp", "rfq", "proposal", "quote", "quotation", "sourcing",
-            "acquisition", "acquire", "university", "uw", "department"
-        ]
-        
-        return any(keyword in question_lower for keyword in procurement_keywords)
+        return _PROCUREMENT_KEYWORDS_RE.search(question) is not None
     
     def format_conversation_history(self, history: List[Dict[str, Any]], max_turns: int = 3) -> str:
         """
@@ -0,0 +1,152 @@
+"""
+Response cache for RAG answers.
+Lets repeated or paraphrased questions skip the full retrieval and generation pipeline.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+class ResponseCache:
+    """
+    In-process LRU cache with TTL expiry for RAG responses.
+
+    Lookups first try an exact match on the normalized question text, then
+    fall back to cosine similarity between question embeddings so paraphrases
+    of a cached question can be served without re-running the pipeline.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 900, similarity_threshold: float = 0.95):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+        # Unit-normalized question embeddings, one row per slot; allocated on first use
+        self._vectors: Optional[np.ndarray] = None
+        self._slots: Dict[bytes, int] = {}
+        self._slot_keys: List[Optional[bytes]] = [None] * maxsize
+        self._free_slots: List[int] = list(range(maxsize - 1, -1, -1))
+
+    @staticmethod
+    def make_key(question: str) -> bytes:
+        """Hash the question after lowercasing and collapsing whitespace"""
+        normalized = " ".join(question.lower().split())
+        return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+    def get(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response by exact (normalized) question match.
+
+        Args:
+            question: The user's question
+
+        Returns:
+            The cached response, or None on a miss or an expired entry
+        """
+        return self._get_by_key(self.make_key(question))
+
+    def get_similar(self, vector: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Look up the cached response whose question embedding is closest to `vector`.
+
+        Args:
+            vector: Embedding of the user's question
+
+        Returns:
+            The cached response if its cosine similarity meets the threshold, otherwise None
+        """
+        if self._vectors is None or not self._slots:
+            return None
+
+        query = self._normalize(vector)
+        if query is None:
+            return None
+
+        similarities = self._vectors @ query
+        slot = int(np.argmax(similarities))
+        if similarities[slot] < self.similarity_threshold:
+            return None
+
+        key = self._slot_keys[slot]
+        return self._get_by_key(key) if key is not None else None
+
+    def put(self, question: str, value: Dict[str, Any], vector: Optional[List[float]] = None):
+        """
+        Store a response for a question, evicting the least recently used entries.
+
+        Args:
+            question: The user's question
+            value: Response data to cache
+            vector: Optional embedding of the question, enabling similarity lookups
+        """
+        key = self.make_key(question)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._release_slot(evicted_key)
+
+        if vector is not None:
+            self._store_vector(key, vector)
+
+    def clear(self):
+        """Drop all cached responses"""
+        for key in list(self._entries):
+            self._release_slot(key)
+        self._entries.clear()
+
+    def _get_by_key(self, key: bytes) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._release_slot(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        if not norm:
+            return None
+        return array / norm
+
+    def _store_vector(self, key: bytes, vector: List[float]):
+        unit = self._normalize(vector)
+        if unit is None:
+            return
+
+        if self._vectors is None:
+            self._vectors = np.zeros((self.maxsize, unit.shape[0]), dtype=np.float32)
+        elif unit.shape[0] != self._vectors.shape[1]:
+            # Embedding model changed dimensions; keep the exact-match entry only
+            return
+
+        slot = self._slots.get(key)
+        if slot is None:
+            if not self._free_slots:
+                return
+            slot = self._free_slots.pop()
+            self._slots[key] = slot
+            self._slot_keys[slot] = key
+        self._vectors[slot] = unit
+
+    def _release_slot(self, key: bytes):
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._vectors[slot] = 0.0
+        self._slot_keys[slot] = None
+        self._free_slots.append(slot)
@@ -1,9 +1,13 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
+import orjson
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.routers import agents
+from app.services.llm_service import close_http_clients
 
 
 @asynccontextmanager
@@ -12,16 +16,26 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting Procurement Agent API...")
     print(f"📊 Debug mode: {settings.debug}")
+    if settings.warmup_on_startup:
+        print("🔥 Warming up RAG agent...")
+        try:
+            # Bounded so a hanging Azure endpoint cannot keep the app from starting
+            await asyncio.wait_for(agents.get_rag_agent().warmup(), timeout=settings.warmup_timeout_seconds)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Warmup timed out after {settings.warmup_timeout_seconds}s, continuing startup")
     yield
     # Shutdown
     print("🛑 Shutting down Procurement Agent API...")
+    await close_http_clients()
 
 
 app = FastAPI(
     title="Procurement Agent API",
     description="Multi-agent FastAPI backend for procurement assistance with M365 Teams integration",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson is already a dependency and serializes JSON responses several times faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS for Teams and frontend integration
@@ -42,18 +56,22 @@ app.add_middleware(
 app.include_router(agents.router, prefix="/agents", tags=["agents"])
 
 
+# The root payload never changes, so it is serialized once at import
+_ROOT_PAYLOAD = orjson.dumps({
+    "message": "Procurement Agent API is running",
+    "version": "1.0.0",
+    "features": [
+        "Multi-agent RAG system",
+        "Supervisor-agent orchestration",
+        "Microsoft Teams integration",
+        "Azure OpenAI & Search integration"
+    ]
+})
+
+
 @app.get("/")
 async def root():
-    return {
-        "message": "Procurement Agent API is running",
-        "version": "1.0.0",
-        "features": [
-            "Multi-agent RAG system",
-            "Supervisor-agent orchestration",
-            "Microsoft Teams integration",
-            "Azure OpenAI & Search integration"
-        ]
-    }
+    return Response(content=_ROOT_PAYLOAD, media_type="application/json")
 
 
 @app.get("/health")
@@ -61,7 +79,8 @@ async def health_check():
     return {
         "status": "healthy",
         "api_version": "1.0.0",
-        "environment": "development" if settings.debug else "production"
+        "environment": "development" if settings.debug else "production",
+        "rag_pipeline": agents.get_rag_agent().pipeline_stats(),
     }
 
 
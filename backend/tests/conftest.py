@@ -0,0 +1,95 @@
+"""
+Shared fixtures: a RAGAgent wired to in-memory fakes instead of Azure OpenAI and Azure Search.
+"""
+
+import asyncio
+import json
+import re
+from typing import List, Optional
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from app.agents.rag_agent import RAGAgent
+from app.services.memory_service import ConversationMemoryService
+from app.services.query_processor import QueryProcessor
+
+ANSWER = "Purchases over $10,000 need a purchase order [1]."
+
+
+class FakeChatModel(FakeListChatModel):
+    """Answers each prompt by its type: every numbered document is graded relevant, docs are sufficient."""
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        text = "\n".join(getattr(message, "content", str(message)) for message in messages)
+        if '"grades"' in text:
+            indices = sorted({int(i) for i in re.findall(r"\[(\d+)\] ", text)})
+            return json.dumps({"grades": [{"idx": i, "relevant": True, "score": 5} for i in indices]})
+        if "sufficient" in text:
+            return '{"sufficient": true}'
+        if "REWRITTEN QUERY" in text:
+            return "rewritten procurement question"
+        return ANSWER
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in re.split(r"(\s)", self._call(messages)):
+            if token:
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._stream(messages):
+            yield chunk
+
+
+class FakeEmbeddings:
+    """Embeds every text to the same vector"""
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return [1.0, 0.0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeRetriever:
+    """Returns fixed documents and counts searches; set `gate` to hold searches until it is set"""
+
+    def __init__(self, documents: List[Document]):
+        self.documents = documents
+        self.calls = 0
+        self.gate: Optional[asyncio.Event] = None
+
+    async def ainvoke(self, query: str, query_embedding: Optional[List[float]] = None) -> List[Document]:
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return list(self.documents)
+
+    async def _acheck_semantic_availability(self) -> bool:
+        return False
+
+
+def policy_documents() -> List[Document]:
+    return [
+        Document(page_content="Purchases over $10,000 need a purchase order.", metadata={"source": "Policy A", "chunk_id": "c1"}),
+        Document(page_content="Laptops are bought through the catalog.", metadata={"source": "Policy B", "chunk_id": "c2"}),
+    ]
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    """Builds a RAGAgent backed by the fakes above, with conversation memory in a temp file"""
+
+    def factory(documents: Optional[List[Document]] = None) -> RAGAgent:
+        agent = RAGAgent()
+        agent.memory_service = ConversationMemoryService(str(tmp_path / "memory.json"))
+        agent.llm = FakeChatModel(responses=["unused"])
+        agent.embeddings = FakeEmbeddings()
+        agent.retriever = FakeRetriever(policy_documents() if documents is None else documents)
+        agent.query_processor = QueryProcessor(agent.llm)
+        return agent
+
+    return factory
@@ -0,0 +1,207 @@
+"""
+Tests for the SSE helpers in the agents router.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sse_starlette.sse import AppStatus
+
+from app.config import settings
+from app.routers.agents import _build_sse_frame, _coalesce_chunks, get_rag_agent, router
+
+from .conftest import ANSWER
+
+
+async def collect(chunks, **kwargs):
+    return [frame async for frame in _coalesce_chunks(chunks, **kwargs)]
+
+
+async def tokens(*items, pause_after=None, pause=0.0):
+    for i, item in enumerate(items):
+        yield item
+        if i == pause_after:
+            await asyncio.sleep(pause)
+
+
+def test_coalesce_flushes_at_size_limit():
+    frames = asyncio.run(collect(tokens("ab", "cd", "ef", "g"), max_chars=4, max_delay=10))
+
+    assert frames == ["abcd", "efg"]
+
+
+def test_coalesce_flushes_at_delay_limit():
+    frames = asyncio.run(collect(tokens("a", "b", "c", pause_after=1, pause=0.2), max_chars=100, max_delay=0.02))
+
+    assert frames == ["ab", "c"]
+
+
+def test_coalesce_closes_source_when_consumer_stops_early():
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            yield "first"
+            await asyncio.sleep(10)
+            yield "never sent"
+        finally:
+            closed.set()
+
+    async def scenario():
+        frames = _coalesce_chunks(source(), max_chars=1)
+        assert await frames.__anext__() == "first"
+        await frames.aclose()
+        assert closed.is_set()
+        leftover = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        assert leftover == []
+
+    asyncio.run(scenario())
+
+
+def test_coalesce_bounds_read_ahead():
+    produced = []
+
+    async def source():
+        for i in range(100):
+            produced.append(i)
+            yield "x"
+
+    async def scenario():
+        frames = _coalesce_chunks(source(), max_chars=1, queue_size=4)
+        await frames.__anext__()
+        await asyncio.sleep(0.05)
+        read_ahead = len(produced)
+        await frames.aclose()
+        return read_ahead
+
+    # One chunk consumed, up to queue_size queued, one held by the reader waiting on a full queue
+    assert asyncio.run(scenario()) <= 1 + 4 + 1
+
+
+def test_coalesce_sends_buffered_text_before_source_error():
+    async def source():
+        yield "partial"
+        raise RuntimeError("upstream failed")
+
+    async def scenario():
+        frames = []
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            async for frame in _coalesce_chunks(source(), max_delay=10):
+                frames.append(frame)
+        return frames
+
+    assert asyncio.run(scenario()) == ["partial"]
+
+
+def test_sse_frame_keeps_every_line():
+    assert _build_sse_frame("a\n\nb") == b"data: a\ndata: \ndata: b\n\n"
+    assert _build_sse_frame("{}", event=b"error") == b"event: error\ndata: {}\n\n"
+
+
+@pytest.fixture
+def saturating_settings(monkeypatch):
+    """One graph run at a time and at most two queued, as in a small deployment under burst load"""
+    monkeypatch.setattr(settings, "rag_max_concurrency", 1)
+    monkeypatch.setattr(settings, "rag_max_queued", 2)
+    # sse-starlette keeps a module-level exit event bound to the first event loop that used it
+    monkeypatch.setattr(AppStatus, "should_exit_event", None)
+
+
+def make_client(agent) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(router, prefix="/agents")
+    app.dependency_overrides[get_rag_agent] = lambda: agent
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+
+def post_question(http: httpx.AsyncClient, question: str, conversation_id: str):
+    return asyncio.ensure_future(
+        http.post("/agents/query/stream", json={"question": question, "conversation_id": conversation_id})
+    )
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_burst_is_admitted_only_up_to_queue_limit(make_agent, saturating_settings):
+    agent = make_agent()
+    agent.retriever.gate = asyncio.Event()
+    peak_waiting = 0
+
+    async def scenario():
+        nonlocal peak_waiting
+        async with make_client(agent) as http:
+            requests = [post_question(http, f"Question {i}?", f"c{i}") for i in range(12)]
+
+            def rejected_settled():
+                nonlocal peak_waiting
+                peak_waiting = max(peak_waiting, agent._pipeline_waiting)
+                return sum(request.done() for request in requests) >= 12 - 3 and agent.retriever.calls == 1
+
+            await wait_until(rejected_settled)
+            agent.retriever.gate.set()
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+    statuses = [response.status_code for response in responses]
+
+    # One run active plus at most two queued; everything else is turned away
+    assert peak_waiting <= 2
+    assert statuses.count(200) <= 3
+    assert statuses.count(429) >= 9
+    assert all(response.headers["retry-after"] == "5" for response in responses if response.status_code == 429)
+    assert agent.pipeline_stats()["waiting"] == 0
+    assert agent.pipeline_stats()["active"] == 0
+
+
+def test_cache_hit_is_served_while_queue_is_full(make_agent, saturating_settings):
+    agent = make_agent()
+
+    async def scenario():
+        async with make_client(agent) as http:
+            first = await post_question(http, "What is the PO threshold?", "c1")
+            agent._pipeline_waiting = settings.rag_max_queued
+            second = await post_question(http, "What is the PO threshold?", "c2")
+            agent._pipeline_waiting = 0
+            return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert ANSWER in second.text
+    assert agent.retriever.calls == 1
+
+
+def test_single_flight_follower_is_served_while_queue_is_full(make_agent, saturating_settings, monkeypatch):
+    monkeypatch.setattr(settings, "rag_max_queued", 1)
+    agent = make_agent()
+    agent.retriever.gate = asyncio.Event()
+
+    async def scenario():
+        async with make_client(agent) as http:
+            leader = post_question(http, "What is the PO threshold?", "c1")
+            await wait_until(lambda: agent.retriever.calls == 1)
+            # The leader now holds the only slot; a second question fills the one queue place
+            queued = post_question(http, "How do I buy a laptop?", "c2")
+            await wait_until(lambda: agent.is_saturated())
+
+            follower = post_question(http, "What is the PO threshold?", "c3")
+            rejected = await post_question(http, "Who approves travel?", "c4")
+            await wait_until(lambda: agent.response_cache.make_key("What is the PO threshold?") in agent._inflight_answers)
+            agent.retriever.gate.set()
+            return await asyncio.gather(leader, queued, follower), rejected
+
+    (leader, queued, follower), rejected = asyncio.run(scenario())
+
+    assert rejected.status_code == 429
+    assert [leader.status_code, queued.status_code, follower.status_code] == [200, 200, 200]
+    assert ANSWER in follower.text
+    assert agent.retriever.calls == 2
+    assert agent.pipeline_stats()["waiting"] == 0
@@ -0,0 +1,34 @@
+"""
+Tests for the file-backed conversation memory.
+"""
+
+from app.services.memory_service import MAX_STORED_ANSWER_CHARS, ConversationMemoryService
+
+
+def test_long_answer_is_truncated_on_save(tmp_path):
+    memory = ConversationMemoryService(str(tmp_path / "memory.json"))
+    answer = "x" * (MAX_STORED_ANSWER_CHARS * 10)
+
+    memory.save_conversation_memory({"question": "q", "answer": answer}, "c1")
+
+    # Read back through a fresh instance so the file, not the in-process cache, is checked
+    stored = ConversationMemoryService(str(tmp_path / "memory.json")).load_conversation_memory("c1")
+    assert stored["history"][0]["answer"] == answer[:MAX_STORED_ANSWER_CHARS]
+
+
+def test_short_answer_is_stored_unchanged(tmp_path):
+    memory = ConversationMemoryService(str(tmp_path / "memory.json"))
+
+    memory.save_conversation_memory({"question": "q", "answer": "Use a PO."}, "c1")
+
+    assert memory.load_conversation_memory("c1")["history"] == [{"question": "q", "answer": "Use a PO."}]
+
+
+def test_history_keeps_last_ten_entries(tmp_path):
+    memory = ConversationMemoryService(str(tmp_path / "memory.json"))
+
+    for i in range(12):
+        memory.save_conversation_memory({"question": f"q{i}", "answer": f"a{i}"}, "c1")
+
+    history = memory.load_conversation_memory("c1")["history"]
+    assert [entry["question"] for entry in history] == [f"q{i}" for i in range(2, 12)]
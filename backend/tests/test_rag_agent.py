@@ -0,0 +1,281 @@
+"""
+Tests for the RAG agent pipeline, run against fake models and search.
+"""
+
+import asyncio
+
+from langchain_core.documents import Document
+
+from app.agents.base_agent import AgentState
+from app.agents.rag_agent import RAGAgent
+from app.config import settings
+
+from .conftest import ANSWER, policy_documents
+
+
+def ask(agent, question: str, conversation_id: str = "test"):
+    state = AgentState(agent_id="test", task_id="t1", data={"question": question, "conversation_id": conversation_id})
+    return agent.process(state)
+
+
+def test_answer_is_cached_for_repeat_first_turn_question(make_agent):
+    agent = make_agent()
+
+    first = asyncio.run(ask(agent, "What is the PO threshold?", "c1"))
+    second = asyncio.run(ask(agent, "what is the po threshold?", "c2"))
+
+    assert first.success and second.success
+    assert second.message == ANSWER
+    assert agent.retriever.calls == 1
+
+
+def test_retrieval_failure_fallback_is_not_cached(make_agent):
+    agent = make_agent(documents=[])
+
+    first = asyncio.run(ask(agent, "What is the PO threshold?", "c1"))
+    assert first.success
+    assert agent.response_cache.get("What is the PO threshold?") is None
+
+    # Search recovers; the same question must go back through the pipeline
+    agent.retriever.documents = make_agent().retriever.documents
+    second = asyncio.run(ask(agent, "What is the PO threshold?", "c2"))
+
+    assert agent.retriever.calls == 2
+    assert second.message == ANSWER
+
+
+class StubGradingChain:
+    """Stands in for the grading chain, returning `result` or raising it if it is an exception"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def grade(agent, documents, result):
+    agent._initialize_models()
+    agent._grading_chain = StubGradingChain(result)
+    return asyncio.run(agent._grade_and_rank_documents(documents, "What is the PO threshold?"))
+
+
+def test_parse_relevance_grades_well_formed():
+    result = {"grades": [
+        {"idx": 0, "relevant": True, "score": 3},
+        {"idx": 1, "relevant": False, "score": 1},
+        {"idx": 2, "relevant": "yes", "score": "5"},
+    ]}
+
+    assert RAGAgent._parse_relevance_grades(result, 3) == {0: 3.0, 2: 5.0}
+
+
+def test_parse_relevance_grades_accepts_bare_list_and_bad_scores():
+    result = [{"idx": "1", "relevant": True, "score": "high"}]
+
+    assert RAGAgent._parse_relevance_grades(result, 2) == {1: 0.0}
+
+
+def test_parse_relevance_grades_skips_missing_and_out_of_range_indices():
+    result = {"grades": [
+        {"relevant": True, "score": 4},
+        {"idx": 7, "relevant": True, "score": 4},
+        {"idx": 1, "relevant": True, "score": 2},
+    ]}
+
+    assert RAGAgent._parse_relevance_grades(result, 2) == {1: 2.0}
+
+
+def test_parse_relevance_grades_all_irrelevant_is_empty_not_ungraded():
+    result = {"grades": [{"idx": 0, "relevant": False}, {"idx": 1, "relevant": "no"}]}
+
+    assert RAGAgent._parse_relevance_grades(result, 2) == {}
+
+
+def test_parse_relevance_grades_unusable_output_is_ungraded():
+    assert RAGAgent._parse_relevance_grades("not json at all", 2) is None
+    assert RAGAgent._parse_relevance_grades({"answer": "yes"}, 2) is None
+    assert RAGAgent._parse_relevance_grades({"grades": [{"score": 5}, "junk"]}, 2) is None
+    assert RAGAgent._parse_relevance_grades({"grades": [{"idx": 9, "relevant": True}]}, 2) is None
+
+
+def test_grading_error_fails_open_in_search_order(make_agent):
+    agent = make_agent()
+    documents = policy_documents()
+
+    ranked = grade(agent, documents, ValueError("Invalid json output"))
+
+    assert ranked == documents
+
+
+def test_unparseable_grades_fail_open_in_search_order(make_agent):
+    agent = make_agent()
+    documents = policy_documents()
+
+    ranked = grade(agent, documents, {"verdict": "looks fine"})
+
+    assert ranked == documents
+
+
+def test_grade_and_rerank_drops_irrelevant_ranks_and_dedupes(make_agent):
+    documents = [
+        Document(page_content="Catalog purchasing overview.", metadata={"chunk_id": "low"}),
+        Document(page_content="Holiday schedule.", metadata={"chunk_id": "off-topic"}),
+        Document(page_content="Purchases over $10,000 need a PO.", metadata={"chunk_id": "high"}),
+        Document(page_content="Catalog purchasing overview.", metadata={"chunk_id": "low"}),
+        Document(page_content="Sole-source justification rules.", metadata={}),
+        Document(page_content="Sole-source justification rules.", metadata={}),
+    ]
+    agent = make_agent(documents=documents)
+    agent._initialize_models()
+    # After de-duplication the grader sees four documents: low, off-topic, high, sole-source
+    grading_chain = StubGradingChain({"grades": [
+        {"idx": 0, "relevant": True, "score": 2},
+        {"idx": 1, "relevant": False, "score": 1},
+        {"idx": 2, "relevant": True, "score": 5},
+        {"idx": 3, "relevant": True, "score": 2},
+    ]})
+    agent._grading_chain = grading_chain
+    state = {"question": "PO threshold?", "original_question": "PO threshold?", "documents": []}
+
+    state.update(asyncio.run(agent._retrieve_documents(state)))
+    assert len(state["documents"]) == 4
+
+    ranked = asyncio.run(agent._grade_and_rerank_documents(state))["documents"]
+
+    assert grading_chain.calls == 1
+    assert [doc.page_content for doc in ranked] == [
+        "Purchases over $10,000 need a PO.",
+        "Catalog purchasing overview.",
+        "Sole-source justification rules.",
+    ]
+
+
+async def wait_until(condition, timeout: float = 2.0):
+    """Yields to the event loop until `condition()` holds"""
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_identical_concurrent_questions_share_one_run(make_agent):
+    agent = make_agent()
+    agent.retriever.gate = asyncio.Event()
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(ask(agent, "What is the PO threshold?", f"c{i}")) for i in range(5)]
+        await wait_until(lambda: agent.retriever.calls == 1)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        agent.retriever.gate.set()
+        return await asyncio.gather(*tasks)
+
+    responses = asyncio.run(scenario())
+
+    assert agent.retriever.calls == 1
+    assert [response.message for response in responses] == [ANSWER] * 5
+    assert agent._inflight_answers == {}
+
+
+def test_follower_takes_over_when_leader_is_cancelled(make_agent):
+    agent = make_agent()
+    agent.retriever.gate = asyncio.Event()
+
+    async def scenario():
+        leader = asyncio.ensure_future(ask(agent, "What is the PO threshold?", "leader"))
+        await wait_until(lambda: agent.retriever.calls == 1)
+        followers = [asyncio.ensure_future(ask(agent, "What is the PO threshold?", f"f{i}")) for i in range(2)]
+        for _ in range(10):
+            await asyncio.sleep(0)
+
+        leader.cancel()
+        # Exactly one follower starts a new run; the other waits on it
+        await wait_until(lambda: agent.retriever.calls == 2)
+        agent.retriever.gate.set()
+        responses = await asyncio.gather(*followers)
+        return leader, responses
+
+    leader, responses = asyncio.run(scenario())
+
+    assert leader.cancelled()
+    assert agent.retriever.calls == 2
+    assert [response.message for response in responses] == [ANSWER] * 2
+    assert agent._inflight_answers == {}
+
+
+def test_questions_with_history_bypass_single_flight(make_agent):
+    agent = make_agent()
+    agent.memory_service.save_conversation_memory({"question": "Hi", "answer": "Hello"}, "h")
+    agent.retriever.gate = asyncio.Event()
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(ask(agent, "What is the PO threshold?", "h")) for _ in range(2)]
+        await wait_until(lambda: agent.retriever.calls == 2)
+        assert agent._inflight_answers == {}
+        agent.retriever.gate.set()
+        return await asyncio.gather(*tasks)
+
+    responses = asyncio.run(scenario())
+
+    assert agent.retriever.calls == 2
+    assert all(response.success for response in responses)
+
+
+def test_leader_without_answer_wakes_followers_to_recompute(make_agent):
+    agent = make_agent()
+    question = "What is the PO threshold?"
+
+    async def scenario():
+        shared, leader_future = await agent._join_or_lead_inflight(question, {})
+        assert shared is None and leader_future is not None
+
+        followers = [asyncio.ensure_future(agent._join_or_lead_inflight(question, {})) for _ in range(2)]
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert not any(follower.done() for follower in followers)
+
+        agent._finish_inflight(question, leader_future, {"generation": ""})
+        await wait_until(lambda: any(follower.done() for follower in followers))
+
+        # The first follower to wake leads the retry; the second waits on it instead of hanging
+        first, second = followers
+        shared, retry_future = first.result()
+        assert shared is None and retry_future is not None
+        assert not second.done()
+
+        agent._finish_inflight(question, retry_future, {"generation": ANSWER})
+        return await asyncio.wait_for(second, 1)
+
+    shared, future = asyncio.run(scenario())
+
+    assert shared == {"generation": ANSWER}
+    assert future is None
+    assert agent._inflight_answers == {}
+
+
+def test_pipeline_reservation_is_counted_once(make_agent, monkeypatch):
+    monkeypatch.setattr(settings, "rag_max_queued", 2)
+    agent = make_agent()
+
+    first, second = agent.reserve_pipeline_slot(), agent.reserve_pipeline_slot()
+    assert agent.pipeline_stats()["waiting"] == 2
+    assert agent.reserve_pipeline_slot() is None
+
+    # An unused reservation, e.g. for a response that was never streamed, gives its place back once
+    first.release()
+    first.release()
+    assert agent.pipeline_stats()["waiting"] == 1
+
+    async def run_with(reservation):
+        async with agent._pipeline_slot(reservation):
+            assert agent.pipeline_stats() == {"active": 1, "waiting": 0, "max_concurrency": settings.rag_max_concurrency, "max_queued": 2}
+
+    asyncio.run(run_with(second))
+    second.release()
+    assert agent.pipeline_stats()["waiting"] == 0
+    assert agent.pipeline_stats()["active"] == 0
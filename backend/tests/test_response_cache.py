@@ -0,0 +1,101 @@
+"""
+Tests for the in-process RAG response cache.
+"""
+
+from app.services import response_cache
+from app.services.response_cache import ResponseCache
+
+
+class FakeClock:
+    """Stands in for time.monotonic so TTL expiry can be tested without sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_cache(monkeypatch, **kwargs) -> tuple:
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, "monotonic", clock)
+    return ResponseCache(**kwargs), clock
+
+
+def test_exact_match_ignores_case_and_whitespace(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put("What is the PO threshold?", {"generation": "answer"})
+
+    assert cache.get("  what is the   po threshold? ") == {"generation": "answer"}
+    assert cache.get("What is the P-card limit?") is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    cache, clock = make_cache(monkeypatch, ttl=60)
+    cache.put("question", {"generation": "answer"}, vector=[1.0, 0.0])
+
+    clock.now += 59
+    assert cache.get("question") is not None
+
+    clock.now += 2
+    assert cache.get("question") is None
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert not cache._slots
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    cache, _ = make_cache(monkeypatch, maxsize=2)
+    cache.put("first", {"generation": "1"})
+    cache.put("second", {"generation": "2"})
+    cache.get("first")
+    cache.put("third", {"generation": "3"})
+
+    assert cache.get("second") is None
+    assert cache.get("first") == {"generation": "1"}
+    assert cache.get("third") == {"generation": "3"}
+
+
+def test_similar_lookup_respects_threshold(monkeypatch):
+    cache, _ = make_cache(monkeypatch, similarity_threshold=0.95)
+    cache.put("What is the PO threshold?", {"generation": "answer"}, vector=[1.0, 0.0])
+
+    assert cache.get_similar([0.99, 0.05]) == {"generation": "answer"}
+    assert cache.get_similar([0.0, 1.0]) is None
+    assert cache.get_similar([0.0, 0.0]) is None
+
+
+def test_eviction_frees_vector_slot_for_reuse(monkeypatch):
+    cache, _ = make_cache(monkeypatch, maxsize=1)
+    cache.put("first", {"generation": "1"}, vector=[1.0, 0.0])
+    cache.put("second", {"generation": "2"}, vector=[0.0, 1.0])
+
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert cache.get_similar([0.0, 1.0]) == {"generation": "2"}
+    assert list(cache._slots.values()) == [0]
+
+
+def test_mismatched_vector_dimensions_keep_exact_match_only(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put("first", {"generation": "1"}, vector=[1.0, 0.0])
+    cache.put("second", {"generation": "2"}, vector=[1.0, 0.0, 0.0])
+
+    assert cache.get("second") == {"generation": "2"}
+    assert cache.get_similar([1.0, 0.0]) == {"generation": "1"}
+
+
+def test_clear_drops_entries_and_vectors(monkeypatch):
+    cache, _ = make_cache(monkeypatch)
+    cache.put("question", {"generation": "answer"}, vector=[1.0, 0.0])
+    cache.clear()
+
+    assert cache.get("question") is None
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert len(cache._free_slots) == cache.maxsize
+
+
+def test_zero_maxsize_stores_nothing(monkeypatch):
+    cache, _ = make_cache(monkeypatch, maxsize=0)
+    cache.put("question", {"generation": "answer"}, vector=[1.0, 0.0])
+
+    assert cache.get("question") is None
+    assert cache.get_similar([1.0, 0.0]) is None